@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from exports import write_excel
+from th_expiry import ThExpiryIndex
+
+# Análises do BI sem dependência do Streamlit: usadas pelas abas do app e pelo
+# processamento em lote (batch_report.py).
+
+def to_excel(df_to_export):
+    return write_excel({"Dados": df_to_export})
+
+def detailed_report_sheets(df, lifecycle, chart_data_dict):
+    """Abas do relatório detalhado: os dados dos gráficos mais os itens parados entre etapas."""
+    report_sheets = chart_data_dict.copy()
+
+    if not lifecycle.empty:
+        orc, rec, fin = (lifecycle[f'{prefixo}_qtd'] > 0 for prefixo in ('orc', 'rec', 'fin'))
+        if (orc_sem_rec := orc & ~rec).any():
+            report_sheets["Orcamento_sem_Recarga"] = df.loc[lifecycle.loc[orc_sem_rec, 'idx_primeira_linha']]
+        if (rec_sem_fin := rec & ~fin).any():
+            report_sheets["Recarga_sem_Finalizacao"] = df.loc[lifecycle.loc[rec_sem_fin, 'idx_ultima_linha']]
+        if (fin_sem_orc := fin & ~orc).any():
+            report_sheets["Finalizado_sem_Orcamento"] = df.loc[lifecycle.loc[fin_sem_orc, 'idx_primeira_linha']]
+    return report_sheets
+
+def generate_detailed_report(df, lifecycle, chart_data_dict):
+    return write_excel(detailed_report_sheets(df, lifecycle, chart_data_dict))
+
+# Cores pela classificação do ThExpiryIndex, para seguirem os prazos de TH de cada tipo de item.
+CRIT_CORES = {"TH vencido": 'background-color: #ff4d4d; color: white;', "TH quase vencido": 'background-color: #ffa500; color: white;'}
+
+def highlight_critical(crit_tipo):
+    return CRIT_CORES.get(crit_tipo, '')
+
+def top_clientes(itens_por_cliente, n=10):
+    """
+    Os n clientes com mais itens únicos (contagem > 0). Empates saem em ordem
+    alfabética do cliente, para o cubo e o cálculo por linhas cortarem igual.
+    """
+    tabela = pd.DataFrame({"cliente": itens_por_cliente.index.astype(str), "itens": itens_por_cliente.to_numpy()})
+    tabela = tabela[tabela["itens"] > 0].sort_values(["itens", "cliente"], ascending=[False, True], kind="stable").head(n)
+    return pd.Series(tabela["itens"].to_numpy(), index=pd.Index(tabela["cliente"], name="cliente"), name="itens")
+
+def agrupar_outros(df_column, top_n=5):
+    if df_column.empty: return df_column
+    top_cats = df_column.value_counts().nlargest(top_n).index
+    return df_column.where(df_column.isin(top_cats), "Outros")
+
+# Prefixos das etapas, os mesmos dos nomes das abas do Excel (orc_A, rec_A, ...).
+ETAPA_PREFIXOS = {"Orçamento": "orc", "Recarga": "rec", "Finalização": "fin", "Teste Hidrostático": "th"}
+
+def _empty_lifecycle():
+    """Ciclo de vida sem itens, com as mesmas colunas do caso geral (ex.: filtro por NF sem resultado)."""
+    colunas = {'chave': object, 'tipo_item': object, 'cliente': object, 'idx_primeira_linha': 'int64', 'idx_ultima_linha': 'int64',
+               'idx_mais_recente': 'int64', 'etapa_atual': object, 'ultima_data': 'datetime64[ns]', 'data_th': 'datetime64[ns]', 'caminho': object}
+    for prefixo in ETAPA_PREFIXOS.values():
+        colunas.update({f'{prefixo}_qtd': 'int64', f'{prefixo}_primeira': 'datetime64[ns]', f'{prefixo}_ultima': 'datetime64[ns]'})
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in colunas.items()})
+
+def build_item_lifecycle(df):
+    """
+    Uma linha por chave com o ciclo de vida do item: registros e primeira/última
+    data em cada etapa, caminho entre etapas, status mais recente e os rótulos
+    das linhas de origem em df. Calculado uma vez por conjunto de dados, é a base
+    das abas e do relatório detalhado.
+    """
+    if df.empty: return _empty_lifecycle()
+    primeiras = df.drop_duplicates('chave', keep='first')
+    ultimas = df.drop_duplicates('chave', keep='last')
+    recentes = df.sort_values('data_inicio', ascending=False).drop_duplicates('chave', keep='first')
+
+    lifecycle = primeiras[['chave', 'tipo_item', 'cliente']].reset_index(drop=True)
+    chaves = lifecycle['chave']
+    def por_chave(values, index): return pd.Series(values, index=index).reindex(chaves).to_numpy()
+    lifecycle['idx_primeira_linha'] = primeiras.index
+    lifecycle['idx_ultima_linha'] = por_chave(ultimas.index, ultimas['chave'])
+    lifecycle['idx_mais_recente'] = por_chave(recentes.index, recentes['chave'])
+    lifecycle['etapa_atual'] = por_chave(recentes['etapa'].to_numpy(), recentes['chave'])
+    lifecycle['ultima_data'] = por_chave(recentes['data_inicio'].to_numpy(), recentes['chave'])
+    lifecycle['data_th'] = por_chave(recentes['data_th'].to_numpy(), recentes['chave'])
+    # Caminho entre etapas na ordem das datas, a mesma usada para contar as transições.
+    chave_codes, ordem = _item_order(df)
+    lifecycle['caminho'] = pd.Series(df['etapa'].to_numpy(dtype=object)[ordem]).groupby(chave_codes[ordem]).agg(" → ".join).to_numpy()
+
+    por_etapa = df.groupby(['chave', 'etapa'], observed=True)['data_inicio'].agg(['size', 'min', 'max'])
+    etapas_presentes = set(por_etapa.index.get_level_values('etapa'))
+    for etapa, prefixo in ETAPA_PREFIXOS.items():
+        stats_etapa = por_etapa.xs(etapa, level='etapa').reindex(chaves) if etapa in etapas_presentes else pd.DataFrame(index=chaves, columns=['size', 'min', 'max'])
+        lifecycle[f'{prefixo}_qtd'] = stats_etapa['size'].fillna(0).astype(int).to_numpy()
+        lifecycle[f'{prefixo}_primeira'] = pd.to_datetime(stats_etapa['min']).to_numpy()
+        lifecycle[f'{prefixo}_ultima'] = pd.to_datetime(stats_etapa['max']).to_numpy()
+    return lifecycle
+
+def identify_critical_items(df, lifecycle, reference_date=None, th_index=None):
+    """
+    Linhas mais recentes dos itens com TH vencido ou quase vencido na data de
+    referência (hoje, por padrão), com as colunas crit_tipo e dias_vencido.
+    """
+    if lifecycle.empty: return pd.DataFrame()
+    criticos = (th_index or ThExpiryIndex(lifecycle)).classify(reference_date)
+    if criticos.empty: return pd.DataFrame()
+    return df.loc[criticos['idx_mais_recente']].assign(crit_tipo=criticos['crit_tipo'].to_numpy(), dias_vencido=criticos['dias_vencido'].to_numpy())
+
+def calculate_lead_times(lifecycle):
+    if lifecycle.empty: return pd.DataFrame()
+    # Mesmo formato do antigo pivot por etapa: primeira data de cada etapa, sem linhas/colunas vazias.
+    df_pivot = pd.DataFrame({etapa: lifecycle[f'{prefixo}_primeira'].to_numpy() for etapa, prefixo in ETAPA_PREFIXOS.items()}, index=pd.Index(lifecycle['chave'], name='chave'))
+    df_pivot = df_pivot.dropna(axis=1, how='all').dropna(how='all')
+    if 'Orçamento' in df_pivot and 'Recarga' in df_pivot: df_pivot['Orçamento ➔ Recarga'] = (df_pivot['Recarga'] - df_pivot['Orçamento']).dt.days
+    if 'Recarga' in df_pivot and 'Finalização' in df_pivot: df_pivot['Recarga ➔ Finalização'] = (df_pivot['Finalização'] - df_pivot['Recarga']).dt.days
+    return df_pivot.reset_index()
+
+def summarize_lead_times(df_lead):
+    """Itens, média, mediana, P90, mínimo e máximo (em dias) de cada intervalo entre etapas."""
+    intervalos = [col for col in df_lead.columns if "➔" in col]
+    if not intervalos: return pd.DataFrame(columns=['intervalo', 'itens', 'media_dias', 'mediana_dias', 'p90_dias', 'min_dias', 'max_dias'])
+    resumo = df_lead[intervalos].agg(['count', 'mean', 'median', lambda s: s.quantile(0.9), 'min', 'max']).T
+    resumo.columns = ['itens', 'media_dias', 'mediana_dias', 'p90_dias', 'min_dias', 'max_dias']
+    return resumo.rename_axis('intervalo').reset_index().astype({'itens': int})
+
+def _item_order(df):
+    """
+    Códigos das chaves (na ordem da primeira linha de cada uma, a mesma do ciclo
+    de vida) e a ordem das linhas por (chave, data_inicio), com NaT por último
+    dentro de cada item, como em sort_values; lexsort é estável.
+    """
+    chave_codes = pd.factorize(df['chave'])[0]
+    datas = df['data_inicio'].to_numpy()
+    data_ordem = np.where(np.isnat(datas), np.iinfo(np.int64).max, datas.view('i8'))
+    return chave_codes, np.lexsort((data_ordem, chave_codes))
+
+def transition_links(df, with_durations=False):
+    """
+    Transições entre etapas consecutivas de cada item, contadas de forma vetorizada:
+    ordena por (chave, data_inicio) e compara cada linha com a anterior. Retorna
+    source, target e value (itens), mais dias_medio com with_durations=True.
+    """
+    colunas = ['source', 'target', 'value'] + (['dias_medio'] if with_durations else [])
+    if len(df) < 2: return pd.DataFrame(columns=colunas)
+    chave_codes, ordem = _item_order(df)
+    etapa_codes, etapas = pd.factorize(df['etapa'])
+    datas = df['data_inicio'].to_numpy()
+    chave_codes, etapa_codes, etapas = chave_codes[ordem], etapa_codes[ordem], np.asarray(etapas, dtype=object)
+    mesmo_item = chave_codes[1:] == chave_codes[:-1]
+    pares = etapa_codes[:-1][mesmo_item] * len(etapas) + etapa_codes[1:][mesmo_item]
+    contagem = np.bincount(pares, minlength=len(etapas) ** 2)
+    presentes = np.flatnonzero(contagem)
+    links = pd.DataFrame({'source': etapas[presentes // len(etapas)], 'target': etapas[presentes % len(etapas)], 'value': contagem[presentes]})
+    if with_durations:
+        datas = datas[ordem]
+        dias = (datas[1:] - datas[:-1])[mesmo_item] / np.timedelta64(1, 'D')
+        validos = ~np.isnan(dias)
+        soma = np.bincount(pares[validos], weights=dias[validos], minlength=len(etapas) ** 2)[presentes]
+        qtd = np.bincount(pares[validos], minlength=len(etapas) ** 2)[presentes]
+        links['dias_medio'] = np.divide(soma, qtd, out=np.full(len(presentes), np.nan), where=qtd > 0)
+    return links.sort_values(['value', 'source', 'target'], ascending=[False, True, True], ignore_index=True)[colunas]
+
+def create_sankey_chart(df_links):
+    if df_links is None or df_links.empty: return None
+    labels = pd.unique(df_links[['source', 'target']].values.ravel('K'))
+    label_map = {label: i for i, label in enumerate(labels)}
+    link = dict(source=df_links['source'].map(label_map), target=df_links['target'].map(label_map), value=df_links['value'])
+    if 'dias_medio' in df_links:
+        link.update(customdata=df_links['dias_medio'], hovertemplate="%{source.label} → %{target.label}<br>%{value} transições<br>Tempo médio: %{customdata:.1f} dias<extra></extra>")
+    fig = go.Figure(go.Sankey(
+        node=dict(pad=25, thickness=20, label=labels, color="#f4a100"),
+        link=link
+    ))
+    fig.update_layout(title_text="Fluxo de Itens Entre Etapas", font_size=12, margin=dict(l=0, r=0, t=40, b=5))
+    return fig
@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
-from data_processing import load_and_process_data
+from data_processing import load_raw_data, load_and_process_data, load_item_lifecycle, load_weekly_cube, filter_view, clientes_do_painel
+from disk_cache import file_fingerprint
+from exports import EXPORT_FORMATS
+from incremental import load_history_data
+from profiling import PROFILE_ENABLED, start_profiling, stop_profiling, profile_stage
 from utils import (
-    display_logo, to_excel, generate_detailed_report, clean_key_text
+    display_logo, export_view, export_report, clean_key_text, memoize_view, get_view_cache
 )
-from tabs.overview_tab import render_overview_tab
+from tabs.overview_tab import render_overview_tab, overview_report_data
 from tabs.lead_time_tab import render_lead_time_tab
 from tabs.risk_tab import render_risk_tab
 from tabs.divergence_tab import render_divergence_tab
@@ -29,101 +33,136 @@ body { background-color: #F8F9FA; font-family: 'Inter', sans-serif; }
 </style>
 """, unsafe_allow_html=True)
 
-# === UI e Lógica Principal ===
-display_logo()
-st.markdown('<h1 class="main-header">BI Ampolas & Tanques - Grupo Franzen</h1>', unsafe_allow_html=True)
-
-# --- Upload e Carregamento dos Dados ---
-upload = st.sidebar.file_uploader("Upload do arquivo Excel (.xlsx)", type=["xlsx"])
-if not upload:
-    st.info("Por favor, faça o upload de um arquivo Excel para começar.")
-    st.stop()
-
-# --- Filtros da Sidebar ---
-st.sidebar.header("Filtros Dinâmicos")
-keys = st.sidebar.multiselect("Campos para chave única:", ["nota_fiscal", "numero_serie", "numero_lacre"], default=["nota_fiscal", "numero_serie", "numero_lacre"])
-if not keys:
-    st.sidebar.error("Selecione ao menos um campo para a chave única.")
-    st.stop()
-
-df_main, stats = load_and_process_data(upload, keys)
-if df_main.empty:
-    st.error("Nenhum dado válido encontrado.")
-    st.stop()
-
-painel = st.sidebar.radio("Painel:", ["Todos", "Ampola", "Tanque Pressurizado", "Tanque Sem Pressão"])
-data_df = df_main.copy()
-if painel != "Todos":
-    data_df = data_df[data_df["tipo_item"] == painel]
-
-clientes_disponiveis = ["Todos"] + sorted(data_df["cliente"].unique())
-sel_cli = st.sidebar.selectbox("Cliente:", clientes_disponiveis)
-if sel_cli != "Todos":
-    data_df = data_df[data_df["cliente"] == sel_cli]
-
-# ### NOVO: Filtro por Nota Fiscal Específica ###
-nf_search = st.sidebar.text_input("Buscar por Nota Fiscal Específica:")
-if nf_search:
+# Instrumentação opcional (BI_PROFILE=1 ou ?profile=1): tempo e memória por etapa desta execução.
+profiler = start_profiling() if PROFILE_ENABLED or st.query_params.get("profile") in ("1", "true") else None
+
+try:
+    # === UI e Lógica Principal ===
+    display_logo()
+    st.markdown('<h1 class="main-header">BI Ampolas & Tanques - Grupo Franzen</h1>', unsafe_allow_html=True)
+
+    # --- Upload e Carregamento dos Dados ---
+    upload = st.sidebar.file_uploader("Upload do arquivo Excel (.xlsx)", type=["xlsx"])
+    if not upload:
+        st.info("Por favor, faça o upload de um arquivo Excel para começar.")
+        st.stop()
+
+    # --- Filtros da Sidebar ---
+    st.sidebar.header("Filtros Dinâmicos")
+    keys = st.sidebar.multiselect("Campos para chave única:", ["nota_fiscal", "numero_serie", "numero_lacre"], default=["nota_fiscal", "numero_serie", "numero_lacre"])
+    if not keys:
+        st.sidebar.error("Selecione ao menos um campo para a chave única.")
+        st.stop()
+    modo_incremental = st.sidebar.toggle("Acumular no histórico (importação incremental)", help="Cada arquivo enviado é somado ao histórico salvo; apenas as linhas novas são processadas.")
+
+    file_bytes = upload.getvalue()
+    file_hash = file_fingerprint(file_bytes)
+    df_raw, raw_stats = load_raw_data(file_hash, file_bytes)
+    if modo_incremental:
+        df_main, stats = load_history_data(file_hash, tuple(keys), df_raw)
+    else:
+        df_main, stats = load_and_process_data(file_hash, tuple(keys), df_raw, raw_stats)
+    if df_main.empty:
+        st.error("Nenhum dado válido encontrado.")
+        st.stop()
+    # Identifica o conjunto de dados carregado, para os caches derivados dele.
+    fonte = f"historico:{stats['rows_read']}" if modo_incremental else file_hash
+    dataset_key = f"{fonte}|{'+'.join(keys)}"
+
+    painel = st.sidebar.radio("Painel:", ["Todos", "Ampola", "Tanque Pressurizado", "Tanque Sem Pressão"])
+    clientes_disponiveis = memoize_view(f"{dataset_key}|{painel}", "clientes", clientes_do_painel, df_main, painel)
+    sel_cli = st.sidebar.selectbox("Cliente:", clientes_disponiveis)
+
+    # ### NOVO: Filtro por Nota Fiscal Específica ###
+    nf_search = st.sidebar.text_input("Buscar por Nota Fiscal Específica:")
     # Usa a mesma função de limpeza dos dados para garantir a comparação correta
-    cleaned_nf_search = clean_key_text(nf_search)
-    data_df = data_df[data_df['nota_fiscal'] == cleaned_nf_search]
-
-
-# --- Resumo Dinâmico ---
-total_unicos_filtrado = data_df['chave'].nunique()
-st.markdown(f"Exibindo **{total_unicos_filtrado}** itens únicos para o painel **{painel}** e cliente **{sel_cli}**.")
-st.markdown("---")
-
-# --- Coleta de dados para o relatório ---
-report_data = {}
-
-# --- Abas do Dashboard ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "📈 Visão Geral",
-    "⏱️ Análise de Tempo",
-    "⚠️ Análise de Divergências",
-    "🔥 Análise de Riscos (TH)",
-    "🔎 Explorador de Itens"
-])
-
-with tab1:
-    render_overview_tab(data_df, sel_cli, report_data)
-
-with tab2:
-    render_lead_time_tab(data_df)
-
-with tab3:
-    render_divergence_tab(data_df)
-
-with tab4:
-    render_risk_tab(data_df, keys)
-
-with tab5:
-    render_explorer_tab(df_main)
-
-
-# --- Sidebar: Ferramentas de Exportação e Info ---
-st.sidebar.markdown("---")
-st.sidebar.header("Ferramentas e Exportação")
-
-with st.sidebar.expander("ℹ️ Qualidade da Importação"):
-    st.write(f"Linhas lidas do Excel: **{stats.get('rows_read', 0)}**")
-    st.write(f"Linhas c/ chave vazia (descartadas): **{stats.get('rows_read', 0) - stats.get('rows_after_key_drop', 0)}**")
-    st.write(f"Itens órfãos (sem cliente): **{stats.get('rows_after_orphans_drop', 0)}**")
-    st.write(f"Total de registros válidos: **{stats.get('rows_after_orphans_drop', 0)}**")
-
-st.sidebar.download_button(
-    label="📥 Baixar Dados da Visão Atual",
-    data=to_excel(data_df),
-    file_name=f"dados_filtrados_{pd.Timestamp.now().strftime('%Y%m%d')}.xlsx",
-    mime="application/vnd.ms-excel"
-)
-
-st.sidebar.download_button(
-    label="📄 Baixar Relatório Detalhado",
-    data=generate_detailed_report(data_df, report_data),
-    file_name=f"relatorio_detalhado_{pd.Timestamp.now().strftime('%Y%m%d')}.xlsx",
-    mime="application/vnd.ms-excel"
-)
-
-st.markdown('<div class="footer">BI Ampolas & Tanques • Powered by Rennan Miranda</div>', unsafe_allow_html=True)
\ No newline at end of file
+    cleaned_nf_search = clean_key_text(nf_search) if nf_search else ""
+
+    # Assinatura dos filtros ativos: chave dos resultados em cache (visão, abas e exportações).
+    filter_key = "|".join([dataset_key, painel, sel_cli, cleaned_nf_search])
+
+    # --- Visão filtrada e ciclo de vida dos itens (uma linha por chave), base das abas e do relatório ---
+    # Guardadas por estado dos filtros; df_main (compartilhado pelo cache) não é copiado sem filtro.
+    lifecycle_completo = load_item_lifecycle(dataset_key, df_main)
+    visao = memoize_view(filter_key, "visao", filter_view, df_main, lifecycle_completo, keys, painel, sel_cli, cleaned_nf_search)
+    data_df = df_main if visao["linhas"] is None else df_main.take(visao["linhas"])
+    lifecycle = visao["lifecycle"]
+    # Os agregados do cubo valem para painel e cliente; a busca por NF volta a contar sobre as linhas.
+    cube = None if cleaned_nf_search else load_weekly_cube(dataset_key, df_main)
+
+
+    # --- Resumo Dinâmico ---
+    total_unicos_filtrado = len(lifecycle)
+    st.markdown(f"Exibindo **{total_unicos_filtrado}** itens únicos para o painel **{painel}** e cliente **{sel_cli}**.")
+    st.markdown("---")
+
+    # --- Abas do Dashboard ---
+    # Só a aba escolhida é calculada e desenhada; as demais guardam o último resultado por filtro.
+    ABAS = {
+        "📈 Visão Geral": lambda: render_overview_tab(data_df, lifecycle, sel_cli, filter_key, painel, cube),
+        "⏱️ Análise de Tempo": lambda: render_lead_time_tab(lifecycle, filter_key),
+        "⚠️ Análise de Divergências": lambda: render_divergence_tab(data_df, lifecycle, filter_key),
+        "🔥 Análise de Riscos (TH)": lambda: render_risk_tab(data_df, lifecycle, keys, filter_key),
+        "🔎 Explorador de Itens": lambda: render_explorer_tab(df_main, dataset_key),
+    }
+    aba = st.radio("Aba:", list(ABAS), horizontal=True, label_visibility="collapsed", key="aba_ativa")
+    with profile_stage(f"aba: {aba}"):
+        ABAS[aba]()
+
+
+    # --- Sidebar: Ferramentas de Exportação e Info ---
+    st.sidebar.markdown("---")
+    st.sidebar.header("Ferramentas e Exportação")
+
+    with st.sidebar.expander("ℹ️ Qualidade da Importação"):
+        st.write(f"Linhas lidas do Excel: **{stats.get('rows_read', 0)}**")
+        st.write(f"Linhas c/ chave vazia (descartadas): **{stats.get('rows_read', 0) - stats.get('rows_after_key_drop', 0)}**")
+        st.write(f"Itens órfãos (sem cliente): **{stats.get('rows_after_orphans_drop', 0)}**")
+        st.write(f"Total de registros válidos: **{stats.get('rows_after_orphans_drop', 0)}**")
+    perfil_slot = st.sidebar.container()
+
+    # Os arquivos só são gerados quando pedidos e ficam em cache pela assinatura dos filtros ativos.
+    formato = st.sidebar.selectbox("Formato dos dados:", list(EXPORT_FORMATS))
+    extensao, mime = EXPORT_FORMATS[formato]
+    if st.sidebar.button("📦 Preparar arquivos para download"):
+        st.session_state["export_filter_key"] = filter_key
+
+    if st.session_state.get("export_filter_key") == filter_key:
+        st.sidebar.download_button(
+            label="📥 Baixar Dados da Visão Atual",
+            data=export_view(filter_key, extensao, data_df),
+            file_name=f"dados_filtrados_{pd.Timestamp.now().strftime('%Y%m%d')}.{extensao}",
+            mime=mime
+        )
+
+        st.sidebar.download_button(
+            label="📄 Baixar Relatório Detalhado",
+            data=export_report(filter_key, data_df, lifecycle, overview_report_data(lifecycle, sel_cli, painel, cube)),
+            file_name=f"relatorio_detalhado_{pd.Timestamp.now().strftime('%Y%m%d')}.xlsx",
+            mime=EXPORT_FORMATS["Excel (.xlsx)"][1]
+        )
+    else:
+        st.sidebar.caption("Os arquivos refletem os filtros atuais e são gerados sob demanda.")
+
+    cache_info = get_view_cache().info()
+    st.sidebar.caption(f"Cache de filtros: {cache_info['hits']} acertos, {cache_info['misses']} cálculos ({cache_info['entries']}/{cache_info['max_entries']} visões guardadas).")
+
+    st.markdown('<div class="footer">BI Ampolas & Tanques • Powered by Rennan Miranda</div>', unsafe_allow_html=True)
+
+    # --- Desempenho desta execução (só com a instrumentação ligada) ---
+    if profiler is not None:
+        stop_profiling()
+        profiler.write_log(dataset=dataset_key, filtros=filter_key, aba=aba)
+        with perfil_slot.expander("⏱️ Desempenho (etapas desta execução)"):
+            if not profiler.records:
+                st.write("Nenhuma etapa medida: os resultados vieram do cache.")
+            else:
+                perfil = pd.DataFrame(profiler.records)
+                perfil["stage"] = ["  " * d + nome for d, nome in zip(perfil["depth"], perfil["stage"])]
+                st.dataframe(perfil.drop(columns="depth").rename(columns={"stage": "Etapa", "seconds": "Segundos", "peak_mb": "Pico de memória (MB)"}), hide_index=True)
+                st.caption(f"Total das etapas de primeiro nível: {perfil.loc[perfil['depth'] == 0, 'seconds'].sum():.3f} s")
+            if profiler.memory_busy:
+                st.caption("Pico de memória não medido: outra sessão está medindo memória neste momento.")
+finally:
+    # st.stop() e novas execuções interrompem o script: o tracemalloc não pode ficar ligado.
+    stop_profiling()
@@ -0,0 +1,155 @@
+"""
+Relatórios em lote, sem o Streamlit, para rodar em jobs agendados.
+
+Processa todas as planilhas .xlsx de uma pasta (filiais, meses...) em paralelo,
+uma por processo, e grava para cada arquivo e para o conjunto:
+  - <arquivo>_relatorio.xlsx: o mesmo relatório detalhado do app (Top 10
+    clientes e itens parados entre etapas);
+  - <arquivo>_risco_th.csv: itens com TH vencido ou quase vencido;
+  - <arquivo>_lead_time.csv: resumo do tempo entre etapas.
+  - consolidado_*: as mesmas saídas juntando todos os arquivos, mais um resumo
+    por arquivo.
+
+Uso:
+    python batch_report.py planilhas/ --saida relatorios/
+    python batch_report.py planilhas/ --saida relatorios/ --processos 4 --chave numero_serie --data-referencia 2025-01-31
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from analytics import (
+    build_item_lifecycle, calculate_lead_times, detailed_report_sheets,
+    identify_critical_items, summarize_lead_times, top_clientes
+)
+from excel_reader import KEY_COLS
+from exports import write_excel
+from ingest import parse_workbook, apply_unique_key
+from th_expiry import ThExpiryIndex
+
+def _top_clientes(lifecycle):
+    top = top_clientes(lifecycle.cliente.value_counts()).reset_index()
+    top.columns = ["Cliente", "Quantidade de Itens Únicos"]
+    return top
+
+def _risk_columns(unique_key_cols):
+    return ["crit_tipo", "cliente", "tipo_item"] + list(unique_key_cols) + ["data_th", "dias_vencido", "chave"]
+
+def process_workbook(path, out_dir, unique_key_cols=tuple(KEY_COLS), reference_date=None):
+    """
+    Processa uma planilha e grava as saídas dela em out_dir. Retorna o resumo
+    e as tabelas que entram no consolidado. Roda num processo do pool, então a
+    leitura das abas é sequencial.
+    """
+    path, out_dir = Path(path), Path(out_dir)
+    inicio = time.perf_counter()
+    df_full, stats = parse_workbook(path.read_bytes(), max_workers=1)
+    if df_full.empty:
+        raise ValueError("nenhuma aba reconhecida na planilha")
+    df, stats = apply_unique_key(df_full, stats, list(unique_key_cols))
+    lifecycle = build_item_lifecycle(df)
+
+    criticos = identify_critical_items(df, lifecycle, reference_date, ThExpiryIndex(lifecycle))
+    risco = criticos[_risk_columns(unique_key_cols)] if not criticos.empty else pd.DataFrame(columns=_risk_columns(unique_key_cols))
+    df_lead = calculate_lead_times(lifecycle)
+    resumo_lead = summarize_lead_times(df_lead)
+    report_sheets = detailed_report_sheets(df, lifecycle, {"Top_10_Clientes": _top_clientes(lifecycle)} if not lifecycle.empty else {})
+
+    (out_dir / f"{path.stem}_relatorio.xlsx").write_bytes(write_excel(report_sheets))
+    risco.to_csv(out_dir / f"{path.stem}_risco_th.csv", index=False, encoding="utf-8-sig")
+    resumo_lead.to_csv(out_dir / f"{path.stem}_lead_time.csv", index=False, encoding="utf-8-sig")
+
+    resumo = {
+        "arquivo": path.name,
+        "linhas_lidas": stats.get("rows_read", 0),
+        "registros_validos": stats.get("rows_after_orphans_drop", 0),
+        "itens_unicos": len(lifecycle),
+        "th_vencido": int((risco["crit_tipo"] == "TH vencido").sum()),
+        "th_quase_vencido": int((risco["crit_tipo"] == "TH quase vencido").sum()),
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+    divergencias = {nome: aba for nome, aba in report_sheets.items() if nome != "Top_10_Clientes"}
+    return {"resumo": resumo, "risco": risco, "lead_time": df_lead, "divergencias": divergencias}
+
+def _with_file(df, arquivo):
+    return df.assign(arquivo=arquivo)[["arquivo"] + list(df.columns)]
+
+def write_consolidated(results, out_dir):
+    """Junta as saídas de todos os arquivos processados com sucesso."""
+    out_dir = Path(out_dir)
+    ok = [r for r in results if "erro" not in r]
+    resumo = pd.DataFrame([r["resumo"] for r in results]).convert_dtypes()
+    risco = pd.concat([_with_file(r["risco"], r["resumo"]["arquivo"]) for r in ok], ignore_index=True) if ok else pd.DataFrame()
+    lead = pd.concat([r["lead_time"] for r in ok], ignore_index=True) if ok else pd.DataFrame()
+    lead_geral = summarize_lead_times(lead)
+    lead_por_arquivo = pd.concat([_with_file(summarize_lead_times(r["lead_time"]), r["resumo"]["arquivo"]) for r in ok], ignore_index=True) if ok else pd.DataFrame()
+
+    sheets = {"Resumo": resumo, "Risco_TH": risco, "Lead_Time": lead_geral, "Lead_Time_por_Arquivo": lead_por_arquivo}
+    for nome in ("Orcamento_sem_Recarga", "Recarga_sem_Finalizacao", "Finalizado_sem_Orcamento"):
+        partes = [_with_file(r["divergencias"][nome], r["resumo"]["arquivo"]) for r in ok if nome in r["divergencias"]]
+        if partes: sheets[nome] = pd.concat(partes, ignore_index=True)
+
+    (out_dir / "consolidado_relatorio.xlsx").write_bytes(write_excel(sheets))
+    risco.to_csv(out_dir / "consolidado_risco_th.csv", index=False, encoding="utf-8-sig")
+    lead_geral.to_csv(out_dir / "consolidado_lead_time.csv", index=False, encoding="utf-8-sig")
+    resumo.to_csv(out_dir / "consolidado_resumo.csv", index=False, encoding="utf-8-sig")
+    return resumo
+
+def find_workbooks(folder, pattern="*.xlsx"):
+    # "~$..." são os arquivos de trava que o Excel deixa com a planilha aberta.
+    return sorted(p for p in Path(folder).glob(pattern) if p.is_file() and not p.name.startswith("~$"))
+
+def run_batch(folder, out_dir, unique_key_cols=tuple(KEY_COLS), reference_date=None, workers=None, pattern="*.xlsx"):
+    paths = find_workbooks(folder, pattern)
+    if not paths:
+        raise FileNotFoundError(f"Nenhuma planilha {pattern} em {folder}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(len(paths), workers or os.cpu_count() or 1))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_workbook, path, out_dir, tuple(unique_key_cols), reference_date): path for path in paths}
+        for n, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+                r = result["resumo"]
+                print(f"[{n}/{len(paths)}] {path.name}: {r['itens_unicos']} itens, {r['th_vencido']} TH vencidos ({r['segundos']} s)")
+            except Exception as e:
+                # Um arquivo com problema não derruba o lote; fica registrado no resumo.
+                result = {"resumo": {"arquivo": path.name, "erro": str(e)}, "erro": str(e)}
+                print(f"[{n}/{len(paths)}] {path.name}: ERRO - {e}", file=sys.stderr)
+            results.append(result)
+
+    results.sort(key=lambda r: r["resumo"]["arquivo"])
+    return results, write_consolidated(results, out_dir)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera os relatórios do BI para todas as planilhas de uma pasta.")
+    parser.add_argument("pasta", help="pasta com as planilhas .xlsx")
+    parser.add_argument("--saida", default="relatorios", help="pasta de saída (padrão: relatorios)")
+    parser.add_argument("--chave", nargs="+", default=KEY_COLS, choices=KEY_COLS, help="campos da chave única (padrão: os três)")
+    parser.add_argument("--data-referencia", help="data de referência do TH, AAAA-MM-DD (padrão: hoje)")
+    parser.add_argument("--processos", type=int, help="número de processos (padrão: número de CPUs)")
+    parser.add_argument("--padrao", default="*.xlsx", help="padrão dos nomes de arquivo (padrão: *.xlsx)")
+    args = parser.parse_args(argv)
+
+    reference_date = pd.Timestamp(args.data_referencia) if args.data_referencia else None
+    inicio = time.perf_counter()
+    try:
+        results, resumo = run_batch(args.pasta, args.saida, args.chave, reference_date, args.processos, args.padrao)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    falhas = sum("erro" in r for r in results)
+    print(f"{len(results) - falhas} de {len(results)} planilhas processadas em {time.perf_counter() - inicio:.1f} s. Saídas em {Path(args.saida).resolve()}")
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Gera planilhas sintéticas no formato das planilhas da oficina, para medir o
+desempenho do BI com volumes controlados.
+
+Cada item (NF + série + lacre) percorre as etapas do seu tipo na ordem
+Orçamento → Recarga → Finalização, com parte dos itens parando no meio do
+caminho e parte passando pelo Teste Hidrostático. Também são gerados os casos
+que a importação precisa tratar: variações de cabeçalho de COLMAP, colunas
+ausentes, chaves numéricas com sufixo '.0', datas 01/01/1970, linhas sem chave,
+linhas em branco e itens órfãos (sem cliente em nenhuma etapa).
+
+Uso:
+    python benchmarks/generate_workbook.py --rows 100k --out benchmarks/data/oficina_100k.xlsx
+"""
+import argparse
+import datetime
+import random
+import re
+import sys
+import zipfile
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from excel_reader import SHEETS, COLMAP
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+CLIENTES = [f"Cliente {i:03d} Ltda" for i in range(1, 301)]
+LAUDOS = ["Aprovado", "Reprovado", "Recarga necessária", "Troca de válvula", None]
+EPOCH = datetime.datetime(1970, 1, 1)
+# Colunas que faltam em algumas abas, como acontece nas planilhas reais.
+COLUNAS_AUSENTES = {"rec_T_S": {"laudo_tecnico"}, "fin_T_P": {"data_th"}, "th_A": {"cliente"}}
+
+def parse_size(text):
+    text = text.lower()
+    return SIZES[text] if text in SIZES else int(float(text))
+
+def _etapas_por_tipo():
+    etapas = {}
+    for sheet_name, tipo_item, etapa in SHEETS:
+        etapas.setdefault(tipo_item, []).append((etapa, sheet_name))
+    return etapas
+
+def _valor_chave(rng, numero):
+    """Mesmo número gravado de formas diferentes: int, float, texto com '.0'."""
+    forma = rng.random()
+    if forma < 0.6: return numero
+    if forma < 0.8: return float(numero)
+    return f"{numero}.0"
+
+def _data_registro(rng, data):
+    """Data de início como vem da planilha: às vezes 01/01/1970 ou vazia."""
+    sorteio = rng.random()
+    if sorteio < 0.01: return EPOCH
+    if sorteio < 0.02: return None
+    return data
+
+def generate_rows(n_rows, seed=0):
+    """
+    Retorna {aba: [linha]} com aproximadamente n_rows linhas; cada linha é uma
+    tupla com os valores das colunas de COLMAP, na ordem de COLMAP.
+    """
+    rng = random.Random(seed)
+    etapas = _etapas_por_tipo()
+    tipos = list(etapas)
+    linhas = {sheet_name: [] for sheet_name, _, _ in SHEETS}
+    total, item = 0, 0
+    while total < n_rows:
+        item += 1
+        tipo = rng.choice(tipos)
+        chave = {
+            "nota_fiscal": _valor_chave(rng, 10_000 + item // 3),
+            "numero_serie": rng.choice([_valor_chave(rng, 500_000 + item), f"SR-{item:07d}"]),
+            "numero_lacre": _valor_chave(rng, rng.randint(1, 99_999)) if rng.random() < 0.9 else None,
+        }
+        cliente = None if rng.random() < 0.02 else rng.choice(CLIENTES)
+        data_th = rng.choices([datetime.datetime(rng.randint(2008, 2024), rng.randint(1, 12), rng.randint(1, 28)), EPOCH, None], weights=[6, 1, 3])[0]
+        inicio = datetime.datetime(2020, 1, 1) + datetime.timedelta(days=rng.randint(0, 5 * 365))
+
+        # Até onde o item chegou no fluxo do seu tipo; parte volta a alguma etapa.
+        fluxo = etapas[tipo]
+        passos = fluxo[:rng.choices(range(1, len(fluxo) + 1), weights=range(1, len(fluxo) + 1))[0]]
+        if rng.random() < 0.05: passos = passos + [rng.choice(passos)]
+        for etapa, sheet_name in passos:
+            inicio += datetime.timedelta(days=rng.randint(0, 40), hours=rng.randint(0, 10))
+            linha = dict(chave, laudo_tecnico=rng.choice(LAUDOS), data_th=data_th, data_inicio=_data_registro(rng, inicio))
+            # O cliente costuma vir só no orçamento; as demais etapas herdam pela chave.
+            linha["cliente"] = cliente if etapa == "Orçamento" or rng.random() < 0.3 else rng.choice([None, ""])
+            if rng.random() < 0.005:
+                linha.update(nota_fiscal=None, numero_serie=None, numero_lacre=None)
+            linhas[sheet_name].append(tuple(linha[col] for col in COLMAP))
+            total += 1
+    return linhas
+
+def write_workbook(linhas, path, seed=0):
+    """Grava as abas com cabeçalhos sorteados entre as variantes de COLMAP."""
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    for sheet_name, rows in linhas.items():
+        ws = wb.create_sheet(sheet_name)
+        colunas = [i for i, col in enumerate(COLMAP) if col not in COLUNAS_AUSENTES.get(sheet_name, set())]
+        ws.append([rng.choice(list(COLMAP.values())[i]) for i in colunas] + ["Observações"])
+        for i, linha in enumerate(rows):
+            ws.append([linha[c] for c in colunas] + [None])
+            if i % 500 == 499: ws.append([])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+    _add_dimensions(path)
+    return path
+
+def _add_dimensions(path):
+    """
+    O modo write-only não grava a tag <dimension> que o Excel sempre grava; sem
+    ela, o openpyxl em modo leitura percorre a aba inteira ao abrir o arquivo.
+    Acrescenta a tag para que a planilha se comporte como uma salva pelo Excel.
+    """
+    tmp = path.with_suffix(".tmp")
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename.startswith("xl/worksheets/sheet"):
+                xml = data.decode("utf-8")
+                rows = re.findall(r'<row r="(\d+)"', xml)
+                last_row = int(rows[-1]) if rows else 1
+                header = re.search(r'<row r="1"[^>]*>(.*?)</row>', xml)
+                n_cols = len(re.findall(r"<c ", header.group(1))) if header else 1
+                xml = xml.replace("<sheetViews>", f'<dimension ref="A1:{get_column_letter(n_cols)}{last_row}" /><sheetViews>', 1)
+                data = xml.encode("utf-8")
+            dst.writestr(item, data)
+    tmp.replace(path)
+
+def generate_workbook(n_rows, path=None, seed=0):
+    path = Path(path) if path else DATA_DIR / f"oficina_{n_rows}_{seed}.xlsx"
+    return write_workbook(generate_rows(n_rows, seed), path, seed)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera uma planilha sintética da oficina.")
+    parser.add_argument("--rows", default="10k", help="10k, 100k, 1m ou um número de linhas")
+    parser.add_argument("--out", help="arquivo .xlsx de saída (padrão: benchmarks/data/)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    path = generate_workbook(parse_size(args.rows), args.out, args.seed)
+    print(f"Planilha gerada: {path}")
+
+if __name__ == "__main__":
+    main()
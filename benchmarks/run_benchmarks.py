@@ -0,0 +1,139 @@
+"""
+Mede tempo e pico de memória de cada etapa do BI sobre planilhas sintéticas
+(ou sobre uma planilha real) e salva o resultado em JSON, para comparar
+execuções antes e depois de mudanças ou atualizações de bibliotecas.
+
+Uso:
+    python benchmarks/run_benchmarks.py --sizes 10k 100k
+    python benchmarks/run_benchmarks.py --workbook planilha.xlsx --no-memory
+
+O pico de memória vem do tracemalloc (alocações Python e NumPy) numa segunda
+execução de cada etapa, para não distorcer os tempos; use --no-memory para
+pular essa execução. Quando a leitura do Excel usa o pool de processos, a
+memória dos processos filhos não entra na conta.
+"""
+import argparse
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from generate_workbook import DATA_DIR, generate_workbook, parse_size
+from analytics import (
+    build_item_lifecycle, calculate_lead_times, identify_critical_items,
+    transition_links, create_sankey_chart, generate_detailed_report
+)
+from excel_reader import KEY_COLS
+from exports import export_frame
+from ingest import parse_workbook, build_keyed_state
+from search_index import ItemSearchIndex
+from th_expiry import ThExpiryIndex
+from weekly_cube import WeeklyCube
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def measure(stage, fn, *args, track_memory=True):
+    """
+    Executa fn(*args) e retorna (resultado, {"stage", "seconds", "peak_mb"}).
+    O tempo vem de uma execução sem rastreamento; com track_memory, a etapa roda
+    de novo sob o tracemalloc só para obter o pico de memória.
+    """
+    gc.collect()
+    inicio = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - inicio
+    peak_mb = None
+    if track_memory:
+        gc.collect()
+        tracemalloc.start()
+        fn(*args)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return result, {"stage": stage, "seconds": round(seconds, 4), "peak_mb": None if peak_mb is None else round(peak_mb, 2)}
+
+def _termos_de_busca(df):
+    nf = next((v for v in df["nota_fiscal"].astype(str) if len(v) >= 4), "1")
+    return [(nf[:2], "contém"), (nf[1:4], "contém"), (nf, "exato"), (nf[:3], "começa com")]
+
+def benchmark_workbook(path, track_memory=True):
+    """Roda todas as etapas, na ordem do app, sobre uma planilha."""
+    stages = []
+    def etapa(stage, fn, *args):
+        result, info = measure(stage, fn, *args, track_memory=track_memory)
+        stages.append(info)
+        print(f"  {stage:<22} {info['seconds']:>9.3f} s" + (f" {info['peak_mb']:>9.1f} MB" if info["peak_mb"] is not None else ""))
+        return result
+
+    file_bytes = Path(path).read_bytes()
+    df_raw, raw_stats = etapa("leitura_excel", parse_workbook, file_bytes)
+    state = etapa("chave_unica", build_keyed_state, df_raw, raw_stats, tuple(KEY_COLS))
+    df = state["df"]
+    lifecycle = etapa("ciclo_de_vida", build_item_lifecycle, df)
+    etapa("lead_time", calculate_lead_times, lifecycle)
+    th_index = etapa("indice_th", ThExpiryIndex, lifecycle)
+    etapa("itens_criticos", identify_critical_items, df, lifecycle, None, th_index)
+    links = etapa("transicoes", transition_links, df, True)
+    etapa("sankey", create_sankey_chart, links)
+    etapa("cubo_semanal", WeeklyCube, df)
+    etapa("relatorio_detalhado", generate_detailed_report, df, lifecycle, {})
+    search_index = etapa("indice_busca", ItemSearchIndex, df)
+    etapa("busca", lambda: [search_index.search(termo, modo) for termo, modo in _termos_de_busca(df)])
+    for fmt in ("csv", "parquet", "xlsx"):
+        etapa(f"exportacao_{fmt}", export_frame, df, fmt)
+
+    return {
+        "workbook": str(path),
+        "file_mb": round(len(file_bytes) / 1024 / 1024, 2),
+        "rows_read": int(raw_stats.get("rows_read", 0)),
+        "rows_valid": len(df),
+        "items": len(lifecycle),
+        "total_seconds": round(sum(s["seconds"] for s in stages), 4),
+        "stages": stages,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do BI.")
+    parser.add_argument("--sizes", nargs="*", default=["10k", "100k"], help="tamanhos das planilhas sintéticas (10k, 100k, 1m ou número de linhas)")
+    parser.add_argument("--workbook", action="append", default=[], help="planilha existente a medir (pode repetir)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="não mede o pico de memória (tempos sem o custo do tracemalloc)")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: benchmarks/results/bench_<data>.json)")
+    args = parser.parse_args(argv)
+
+    workbooks = [Path(w) for w in args.workbook]
+    for size in args.sizes:
+        n_rows = parse_size(size)
+        path = DATA_DIR / f"oficina_{n_rows}_{args.seed}.xlsx"
+        if not path.exists():
+            print(f"Gerando planilha sintética com {n_rows} linhas...")
+            generate_workbook(n_rows, path, args.seed)
+        workbooks.append(path)
+
+    runs = []
+    for path in workbooks:
+        print(f"{path}:")
+        runs.append(benchmark_workbook(path, track_memory=not args.no_memory))
+
+    agora = datetime.datetime.now()
+    result = {
+        "created": agora.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "memory_tracked": not args.no_memory,
+        "runs": runs,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"bench_{agora.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados salvos em {output}")
+
+if __name__ == "__main__":
+    main()
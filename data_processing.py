@@ -1,72 +1,64 @@
+import numpy as np
 import pandas as pd
-import re
 import streamlit as st
+from analytics import build_item_lifecycle
+from ingest import load_workbook_frame, apply_unique_key
+from profiling import profile_stage, profiled
+from weekly_cube import WeeklyCube
 
-@st.cache_data
-def load_and_process_data(uploaded_file, unique_key_cols):
+@st.cache_resource(show_spinner="Lendo planilhas do Excel...", max_entries=8)
+def load_raw_data(file_hash, _file_bytes):
     """
-    Carrega dados do Excel, limpa, unifica e aplica a lógica de negócio
-    para propagar o nome do cliente a partir dos orçamentos.
+    Etapa 1 (cara): leitura e limpeza do Excel, independente da chave única.
+    Fica em cache por arquivo; o objeto é compartilhado e não deve ser alterado.
     """
-    xls = pd.ExcelFile(uploaded_file)
-    SHEETS = [
-        ("orc_A", "Ampola", "Orçamento"), ("rec_A", "Ampola", "Recarga"), ("fin_A", "Ampola", "Finalização"), ("th_A", "Ampola", "Teste Hidrostático"),
-        ("orc_T_P", "Tanque Pressurizado", "Orçamento"), ("rec_T_P", "Tanque Pressurizado", "Recarga"), ("fin_T_P", "Tanque Pressurizado", "Finalização"),
-        ("orc_T_S", "Tanque Sem Pressão", "Orçamento"), ("rec_T_S", "Tanque Sem Pressão", "Recarga")
-    ]
-    COLMAP = {
-        "nota_fiscal": ["Nota Fiscal", "Número da Nota Fiscal", "Nº Nota Fiscal"], "numero_serie": ["Número de Série", "Nº de Série"],
-        "numero_lacre": ["Número do Lacre", "Nº do Lacre"], "cliente": ["Cliente"],
-        "laudo_tecnico": ["Análise Técnica:", "Laudo.", "Laudo Técnico"],
-        "data_th": ["Data do Teste Hidrostático", "Data Fabricação / Teste Hidrostático"], "data_inicio": ["Início:"]
-    }
+    return load_workbook_frame(_file_bytes)
 
-    def clean_key_text(text):
-        if pd.isna(text): return ""
-        s = str(text).replace('.0', '')
-        s = re.sub(r'[^A-Z0-9]', '', s.upper()); return s
-    def clean_text(text):
-        if pd.isna(text): return ""
-        return str(text).strip().upper()
-    def clean_and_convert_date(column):
-        dates = pd.to_datetime(column, errors='coerce')
-        return dates.where(dates.dt.year != 1970, pd.NaT)
+@st.cache_resource(show_spinner=False, max_entries=32)
+def load_and_process_data(file_hash, unique_key_cols, _df_full, _stats):
+    """
+    Etapa 2 (barata): chave única, propagação de cliente/laudo e descarte de
+    órfãos, em cache por arquivo + combinação de campos da chave.
+    O DataFrame é compartilhado entre as sessões e não deve ser alterado.
+    """
+    if _df_full.empty: return pd.DataFrame(), {}
+    return apply_unique_key(_df_full, _stats, list(unique_key_cols))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_item_lifecycle(dataset_key, _df_main):
+    """Tabela de ciclo de vida (uma linha por chave) do conjunto de dados completo."""
+    with profile_stage("ciclo de vida"):
+        return build_item_lifecycle(_df_main)
 
-    all_data = []
-    for sheet_name, tipo_item, etapa in SHEETS:
-        if sheet_name in xls.sheet_names:
-            df_raw = xls.parse(sheet_name)
-            df_processed = pd.DataFrame()
-            for target_col, source_options in COLMAP.items():
-                found_col = next((col for col in source_options if col in df_raw.columns), None)
-                if found_col:
-                    if target_col in ["nota_fiscal", "numero_serie", "numero_lacre"]: df_processed[target_col] = df_raw[found_col].apply(clean_key_text)
-                    elif target_col in ['cliente', 'laudo_tecnico']: df_processed[target_col] = df_raw[found_col].apply(clean_text)
-                    elif "data" in target_col: df_processed[target_col] = clean_and_convert_date(df_raw[found_col])
-                else: df_processed[target_col] = "" if "data" not in target_col else pd.NaT
-            df_processed["tipo_item"], df_processed["etapa"] = tipo_item, etapa
-            all_data.append(df_processed)
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_weekly_cube(dataset_key, _df_main):
+    """Cubo semana × tipo × cliente × etapa do conjunto de dados completo, para a visão geral."""
+    with profile_stage("cubo semanal"):
+        return WeeklyCube(_df_main)
 
-    if not all_data: return pd.DataFrame(), {}
-    
-    df_full = pd.concat(all_data, ignore_index=True)
-    stats = {"rows_read": len(df_full)}
-    
-    df_full['chave'] = df_full['tipo_item'].astype(str) + "|" + df_full[unique_key_cols].agg("|".join, axis=1)
-    df_full = df_full[df_full['chave'].str.replace('|', '').str.strip().astype(bool)]
-    stats["rows_after_key_drop"] = len(df_full)
+@profiled("filtros")
+def filter_view(df_main, lifecycle, keys, painel, cliente, nf):
+    """
+    Aplica os filtros da sidebar. Retorna as posições das linhas de df_main na
+    visão (None quando nada é filtrado) e o ciclo de vida dos itens da visão.
+    `nf` já vem limpo com clean_key_text.
+    """
+    filtro = np.ones(len(df_main), dtype=bool)
+    if painel != "Todos":
+        filtro &= (df_main["tipo_item"] == painel).to_numpy()
+        lifecycle = lifecycle[lifecycle["tipo_item"] == painel]
+    if cliente != "Todos":
+        filtro &= (df_main["cliente"] == cliente).to_numpy()
+        lifecycle = lifecycle[lifecycle["cliente"] == cliente]
+    if nf:
+        filtro &= (df_main["nota_fiscal"] == nf).to_numpy()
+    linhas = None if filtro.all() else np.flatnonzero(filtro)
+    if nf:
+        # Com a NF fora da chave, o filtro separa linhas de um mesmo item: recalcula sobre a visão.
+        visao = df_main if linhas is None else df_main.take(linhas)
+        lifecycle = lifecycle[lifecycle["chave"].isin(visao["chave"].unique())] if "nota_fiscal" in keys else build_item_lifecycle(visao)
+    return {"linhas": linhas, "lifecycle": lifecycle}
 
-    df_com_cliente = df_full[df_full['cliente'].astype(str).str.strip() != ''].copy()
-    mapa_mestre_clientes = df_com_cliente.drop_duplicates('chave', keep='first').set_index('chave')['cliente']
-    df_full['cliente'] = df_full['chave'].map(mapa_mestre_clientes)
-    
-    df_com_laudo = df_full[df_full['laudo_tecnico'].astype(str).str.strip() != ''].copy()
-    if not df_com_laudo.empty:
-        mapa_mestre_laudos = df_com_laudo.drop_duplicates('chave', keep='first').set_index('chave')['laudo_tecnico']
-        df_full['laudo_tecnico'] = df_full['chave'].map(mapa_mestre_laudos)
-    
-    df_full.dropna(subset=['cliente'], inplace=True)
-    df_full['laudo_tecnico'].fillna('N/D', inplace=True)
-    stats["rows_after_orphans_drop"] = len(df_full)
-    
-    return df_full.sort_values("data_inicio"), stats
\ No newline at end of file
+def clientes_do_painel(df_main, painel):
+    clientes = df_main["cliente"] if painel == "Todos" else df_main.loc[df_main["tipo_item"] == painel, "cliente"]
+    return ["Todos"] + sorted(clientes.unique())
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import pandas as pd
+
+# Cache local em disco dos dados já lidos e limpos do Excel (antes da chave única).
+# Cada arquivo enviado vira um par <hash>-v<versão>.parquet + .json (estatísticas de importação).
+# Aumente CACHE_FORMAT_VERSION sempre que o resultado da leitura mudar (COLMAP, limpeza,
+# excel_reader): arquivos de outra versão deixam de ser lidos e são removidos.
+CACHE_FORMAT_VERSION = 1
+CACHE_DIR = Path(os.environ.get("BI_CACHE_DIR", Path(__file__).resolve().parent / ".cache" / "workbooks"))
+CACHE_MAX_BYTES = int(float(os.environ.get("BI_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+def file_fingerprint(file_bytes):
+    """Hash do conteúdo do arquivo; o mesmo Excel reenviado gera o mesmo hash."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+def _paths(fingerprint):
+    name = f"{fingerprint}-v{CACHE_FORMAT_VERSION}"
+    return CACHE_DIR / f"{name}.parquet", CACHE_DIR / f"{name}.json"
+
+def load_cached_frame(fingerprint):
+    """Retorna (df, stats) do cache ou None. Um acerto renova a posição do item no LRU."""
+    data_path, stats_path = _paths(fingerprint)
+    if not (data_path.exists() and stats_path.exists()): return None
+    try:
+        df = pd.read_parquet(data_path)
+        with open(stats_path, encoding="utf-8") as f:
+            stats = json.load(f)
+    except (OSError, ValueError, ImportError):
+        _remove(fingerprint)
+        return None
+    os.utime(data_path)
+    return df, stats
+
+def save_cached_frame(fingerprint, df, stats):
+    """Grava o DataFrame e as estatísticas de forma atômica e aplica o limite de tamanho."""
+    data_path, stats_path = _paths(fingerprint)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_data, tmp_stats = data_path.with_suffix(f".parquet.{os.getpid()}.tmp"), stats_path.with_suffix(f".json.{os.getpid()}.tmp")
+        df.to_parquet(tmp_data, index=False)
+        with open(tmp_stats, "w", encoding="utf-8") as f:
+            json.dump(stats, f)
+        # Estatísticas primeiro: um .parquet só é considerado válido se o .json já existir.
+        os.replace(tmp_stats, stats_path)
+        os.replace(tmp_data, data_path)
+    except (OSError, ValueError, ImportError):
+        _remove(fingerprint)
+        return
+    _evict(keep=data_path)
+
+def _remove(fingerprint):
+    _remove_files(*_paths(fingerprint))
+
+def _remove_files(data_path, stats_path=None):
+    for path in (data_path, stats_path or data_path.with_suffix(".json")):
+        try: path.unlink()
+        except FileNotFoundError: pass
+
+def _evict(keep=None):
+    """
+    Remove os arquivos de outras versões do formato e, depois, os menos usados
+    recentemente até o cache caber em CACHE_MAX_BYTES.
+    """
+    entries = []
+    for path in CACHE_DIR.glob("*.parquet"):
+        if not path.stem.endswith(f"-v{CACHE_FORMAT_VERSION}"):
+            _remove_files(path)
+            continue
+        try: info = path.stat()
+        except FileNotFoundError: continue
+        entries.append((info.st_mtime, info.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES: break
+        if path == keep: continue
+        _remove_files(path)
+        total -= size
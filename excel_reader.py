@@ -0,0 +1,107 @@
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+from text_cleaning import clean_key_series, clean_text_series
+
+# Leitura das abas do Excel em paralelo (um processo por aba), em modo streaming
+# do openpyxl e guardando apenas as colunas mapeadas em COLMAP. O resultado é
+# idêntico ao de pd.ExcelFile(...).parse(aba) seguido da limpeza das colunas.
+
+SHEETS = [
+    ("orc_A", "Ampola", "Orçamento"), ("rec_A", "Ampola", "Recarga"), ("fin_A", "Ampola", "Finalização"), ("th_A", "Ampola", "Teste Hidrostático"),
+    ("orc_T_P", "Tanque Pressurizado", "Orçamento"), ("rec_T_P", "Tanque Pressurizado", "Recarga"), ("fin_T_P", "Tanque Pressurizado", "Finalização"),
+    ("orc_T_S", "Tanque Sem Pressão", "Orçamento"), ("rec_T_S", "Tanque Sem Pressão", "Recarga")
+]
+COLMAP = {
+    "nota_fiscal": ["Nota Fiscal", "Número da Nota Fiscal", "Nº Nota Fiscal"], "numero_serie": ["Número de Série", "Nº de Série"],
+    "numero_lacre": ["Número do Lacre", "Nº do Lacre"], "cliente": ["Cliente"],
+    "laudo_tecnico": ["Análise Técnica:", "Laudo.", "Laudo Técnico"],
+    "data_th": ["Data do Teste Hidrostático", "Data Fabricação / Teste Hidrostático"], "data_inicio": ["Início:"]
+}
+KEY_COLS = ["nota_fiscal", "numero_serie", "numero_lacre"]
+
+# Abaixo deste tamanho o custo de subir processos supera o ganho do paralelismo.
+PARALLEL_MIN_BYTES = int(os.environ.get("BI_PARALLEL_MIN_BYTES", 2 * 1024 * 1024))
+
+def clean_and_convert_date(column):
+    dates = pd.to_datetime(column, errors='coerce')
+    return dates.where(dates.dt.year != 1970, pd.NaT)
+
+def _convert_cell(value):
+    """Mesma conversão de célula feita pelo leitor openpyxl do pandas."""
+    if value is None: return ""
+    if isinstance(value, str) and value in ERROR_CODES: return np.nan
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        as_int = int(value)
+        return as_int if as_int == value else float(value)
+    return value
+
+def _read_selected_columns(ws):
+    """
+    Percorre a aba linha a linha e guarda só as colunas de COLMAP, já com os
+    nomes de destino. Retorna None se nenhuma coluna foi encontrada.
+    """
+    rows = ws.iter_rows(values_only=True)
+    header = [_convert_cell(v) for v in next(rows, ())]
+    selected = {}
+    for target_col, source_options in COLMAP.items():
+        found_idx = next((header.index(col) for col in source_options if col in header), None)
+        if found_idx is not None: selected[target_col] = found_idx
+    if not selected: return None
+
+    data, last_row_with_data = [], -1
+    for row_number, row in enumerate(rows):
+        # Como no pandas, linhas vazias só são descartadas no fim da aba.
+        if any(v is not None and v != "" for v in row): last_row_with_data = row_number
+        data.append([_convert_cell(row[idx]) if idx < len(row) else "" for idx in selected.values()])
+    data = data[: last_row_with_data + 1]
+    return TextParser([list(selected)] + data, header=0, skip_blank_lines=False).read()
+
+def parse_sheet(file_bytes, sheet_name, tipo_item, etapa):
+    """Lê e limpa uma aba; é a unidade de trabalho enviada ao pool de processos."""
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name]
+        ws.reset_dimensions()
+        df_raw = _read_selected_columns(ws)
+    finally:
+        wb.close()
+
+    df_processed = pd.DataFrame()
+    if df_raw is None: df_raw = pd.DataFrame()
+    for target_col in COLMAP:
+        if target_col in df_raw.columns:
+            if target_col in KEY_COLS: df_processed[target_col] = clean_key_series(df_raw[target_col])
+            elif target_col in ['cliente', 'laudo_tecnico']: df_processed[target_col] = clean_text_series(df_raw[target_col])
+            elif "data" in target_col: df_processed[target_col] = clean_and_convert_date(df_raw[target_col])
+        else: df_processed[target_col] = "" if "data" not in target_col else pd.NaT
+    df_processed["tipo_item"], df_processed["etapa"] = tipo_item, etapa
+    return df_processed
+
+def read_workbook_sheets(file_bytes, max_workers=None):
+    """
+    Lê todas as abas de SHEETS presentes no arquivo, na ordem de SHEETS.
+    Usa um processo por aba quando o arquivo é grande o bastante.
+    """
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True, keep_links=False)
+    sheet_names = wb.sheetnames
+    wb.close()
+    jobs = [(sheet_name, tipo_item, etapa) for sheet_name, tipo_item, etapa in SHEETS if sheet_name in sheet_names]
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if workers <= 1 or len(file_bytes) < PARALLEL_MIN_BYTES:
+        return [parse_sheet(file_bytes, *job) for job in jobs]
+
+    # "spawn" evita herdar as threads do servidor Streamlit via fork.
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(parse_sheet, file_bytes, *job) for job in jobs]
+            return [f.result() for f in futures]
+    except BrokenProcessPool:
+        return [parse_sheet(file_bytes, *job) for job in jobs]
@@ -0,0 +1,57 @@
+import io
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+# Formatos oferecidos na exportação da visão atual: rótulo → (extensão, mime).
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV (.csv)": ("csv", "text/csv"),
+    "Parquet (.parquet)": ("parquet", "application/octet-stream"),
+}
+# Linhas convertidas por vez ao gravar no Excel; limita a memória de objetos Python.
+CHUNK_ROWS = 20_000
+
+def _excel_rows(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        bloco = df.iloc[start:start + CHUNK_ROWS].astype(object)
+        yield from bloco.where(bloco.notna(), None).itertuples(index=False, name=None)
+
+def write_excel(sheets):
+    """
+    Grava {nome da aba: DataFrame} num .xlsx com o modo write-only do openpyxl,
+    que escreve as linhas em sequência sem montar a planilha inteira em memória.
+    Abas vazias são ignoradas, como no relatório original.
+    """
+    wb = Workbook(write_only=True)
+    for sheet_name, data in sheets.items():
+        if data.empty: continue
+        ws = wb.create_sheet(title=str(sheet_name)[:31])
+        header = []
+        for col in data.columns:
+            cell = WriteOnlyCell(ws, value=str(col))
+            cell.font = Font(bold=True)
+            header.append(cell)
+        ws.append(header)
+        for row in _excel_rows(data):
+            ws.append(row)
+    if not wb.worksheets:
+        wb.create_sheet(title="Dados")
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+def export_frame(df, fmt="xlsx"):
+    """Bytes do DataFrame no formato pedido ("xlsx", "csv" ou "parquet")."""
+    if fmt == "csv":
+        # BOM para o Excel abrir os acentos corretamente.
+        return df.to_csv(index=False).encode("utf-8-sig")
+    if fmt == "parquet":
+        # O Parquet grava a lista inteira de categorias; sem isso, um recorte pequeno
+        # levaria todas as chaves e clientes do conjunto de dados completo.
+        categorias = df.select_dtypes("category").columns
+        df = df.assign(**{col: df[col].cat.remove_unused_categories() for col in categorias})
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        return buf.getvalue()
+    return write_excel({"Dados": df})
@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import streamlit as st
+from ingest import CATEGORY_COLS, build_chave, build_keyed_state, drop_empty_keys, master_map
+from profiling import profiled
+
+# Importação incremental: cada exportação diária é comparada com o histórico
+# acumulado e só as linhas inéditas são gravadas e processadas.
+# O histórico fica em disco como partes Parquet (dados já limpos, sem chave),
+# mais os identificadores das linhas já vistas e um manifesto. O manifesto é o
+# último arquivo gravado e o único que aponta para os demais: uma gravação
+# interrompida deixa arquivos soltos, mas nunca linhas marcadas como vistas sem
+# estarem numa parte registrada.
+HISTORY_DIR = Path(os.environ.get("BI_HISTORY_DIR", Path(__file__).resolve().parent / ".cache" / "historico"))
+
+# Uma linha é "a mesma" se vier da mesma aba (tipo_item + etapa), com as mesmas
+# chaves limpas e a mesma data de início.
+ROW_ID_COLS = ["tipo_item", "etapa", "nota_fiscal", "numero_serie", "numero_lacre", "data_inicio"]
+
+def row_ids(df):
+    return pd.util.hash_pandas_object(df[ROW_ID_COLS], index=False).to_numpy()
+
+def _read_manifest(history_dir):
+    try:
+        with open(history_dir / "manifest.json", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"rows": 0, "parts": [], "files": []}
+
+def _write_manifest(history_dir, manifest):
+    tmp = history_dir / f"manifest.json.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, history_dir / "manifest.json")
+
+def _load_seen_ids(history_dir, manifest):
+    if not manifest["parts"]: return np.array([], dtype=np.uint64)
+    return np.load(history_dir / manifest.get("ids", "row_ids.npy"))
+
+def history_manifest(history_dir=HISTORY_DIR):
+    return _read_manifest(Path(history_dir))
+
+def read_history_parts(parts, history_dir=HISTORY_DIR):
+    """Lê as partes indicadas, preservando a numeração global das linhas."""
+    history_dir = Path(history_dir)
+    frames = [pd.read_parquet(history_dir / part["file"]).set_axis(pd.RangeIndex(part["start"], part["start"] + part["rows"])) for part in parts]
+    if not frames: return pd.DataFrame()
+    return pd.concat(frames)
+
+_append_lock = threading.Lock()
+
+@profiled("histórico: gravação das linhas novas")
+def append_to_history(df_new, file_hash, history_dir=HISTORY_DIR):
+    """
+    Acrescenta ao histórico as linhas de df_new ainda não vistas.
+    Retorna (linhas inéditas, manifesto). Reenviar o mesmo arquivo não faz nada.
+    """
+    with _append_lock:
+        return _append_to_history(df_new, file_hash, Path(history_dir))
+
+def _append_to_history(df_new, file_hash, history_dir):
+    history_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(history_dir)
+    if file_hash in manifest["files"] or df_new.empty: return df_new.iloc[:0], manifest
+
+    seen = _load_seen_ids(history_dir, manifest)
+    ids = row_ids(df_new)
+    pos = np.searchsorted(seen, ids).clip(max=max(len(seen) - 1, 0))
+    is_new = ~(seen[pos] == ids) if len(seen) else np.ones(len(ids), dtype=bool)
+    df_delta = df_new[is_new].copy()
+    df_delta.index = pd.RangeIndex(manifest["rows"], manifest["rows"] + len(df_delta))
+
+    ids_antigos = manifest.get("ids", "row_ids.npy")
+    if not df_delta.empty:
+        # Parte e identificadores vão para arquivos novos; só o manifesto os torna válidos.
+        part = {"file": f"parte_{len(manifest['parts']):05d}.parquet", "start": manifest["rows"], "rows": len(df_delta)}
+        df_delta.to_parquet(history_dir / part["file"], index=False)
+        manifest["ids"] = f"row_ids_{len(manifest['parts']):05d}.npy"
+        np.save(history_dir / manifest["ids"], np.union1d(seen, ids[is_new]))
+        manifest["parts"].append(part)
+        manifest["rows"] += len(df_delta)
+    manifest["files"].append(file_hash)
+    _write_manifest(history_dir, manifest)
+    if manifest.get("ids", "row_ids.npy") != ids_antigos:
+        (history_dir / ids_antigos).unlink(missing_ok=True)
+    return df_delta, manifest
+
+def _date_order(datas):
+    """data_inicio como inteiros ordenáveis, com NaT por último (como em sort_values)."""
+    valores = datas.to_numpy(dtype="datetime64[ns]")
+    return np.where(np.isnat(valores), np.iinfo(np.int64).max, valores.view("i8"))
+
+def _insert_positions(df_hist, df_rows):
+    """
+    Ordena df_rows como o histórico (data_inicio e, nas datas iguais, o rótulo
+    global da linha) e retorna (df_rows ordenado, posição de cada linha em
+    df_hist). Custa O(delta · log histórico): o histórico não é reordenado.
+    """
+    datas_rows = _date_order(df_rows['data_inicio'])
+    ordem = np.lexsort((df_rows.index.to_numpy(), datas_rows))
+    df_rows, datas_rows = df_rows.iloc[ordem], datas_rows[ordem]
+    datas_hist = _date_order(df_hist['data_inicio'])
+    inicio = np.searchsorted(datas_hist, datas_rows, side="left")
+    posicoes = np.searchsorted(datas_hist, datas_rows, side="right")
+    # Linhas novas têm rótulo maior que todo o histórico e vão para o fim das datas
+    # iguais; órfãos adotados voltam para a posição do seu rótulo.
+    rotulos_hist, rotulos_rows = df_hist.index.to_numpy(), df_rows.index.to_numpy()
+    for i in np.flatnonzero(posicoes > inicio):
+        posicoes[i] = inicio[i] + np.searchsorted(rotulos_hist[inicio[i]:posicoes[i]], rotulos_rows[i])
+    return df_rows, posicoes
+
+def _category_codes(categories, valores):
+    """
+    Código de cada valor nas categorias ordenadas (como as de compact_frame), ou
+    -1 se ausente. Busca binária: só os valores procurados são comparados.
+    """
+    valores = np.asarray(valores, dtype=object)
+    posicoes = categories.searchsorted(valores)
+    achou = posicoes < len(categories)
+    achou[achou] = categories.take(posicoes[achou]).to_numpy(dtype=object) == valores[achou]
+    return np.where(achou, posicoes, -1)
+
+def _extend_categories(serie, valores):
+    """
+    Acrescenta às categorias de `serie` os valores que ainda não existem, cada um
+    na sua posição em ordem. Retorna (categorias, códigos de serie recodificados);
+    os códigos antigos só são deslocados, sem comparar texto.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype): serie = serie.astype("category")
+    categories, codigos = serie.cat.categories, serie.cat.codes.to_numpy()
+    unicos = pd.unique(np.asarray(valores, dtype=object))
+    novos = np.sort(unicos[_category_codes(categories, unicos) < 0])
+    if not len(novos): return categories, codigos
+    inseridos = categories.searchsorted(novos)
+    categories = categories.append(pd.Index(novos, dtype=categories.dtype)).take(np.insert(np.arange(len(categories)), inseridos, np.arange(len(categories), len(categories) + len(novos))))
+    deslocamento = np.searchsorted(inseridos, np.arange(len(serie.cat.categories)), side="right")
+    return categories, np.where(codigos >= 0, codigos + deslocamento[codigos], -1)
+
+def _categorical(codigos, categories):
+    usados = np.bincount(codigos[codigos >= 0], minlength=len(categories)) > 0
+    if not usados.all():
+        # Categoria que deixou de ter linhas (ex.: 'N/D'); compact_frame não a guardaria.
+        categories, codigos = categories[usados], np.where(codigos >= 0, np.cumsum(usados)[codigos] - 1, -1)
+    return pd.Categorical.from_codes(codigos, dtype=pd.CategoricalDtype(categories), validate=False)
+
+def _fill_new_laudos(df_hist, laudos, novos_laudos):
+    """Preenche o laudo das linhas do histórico, só das chaves que ganharam laudo agora."""
+    chave = df_hist['chave']
+    codigos = _category_codes(chave.cat.categories, list(novos_laudos))
+    linhas = np.flatnonzero(np.isin(chave.cat.codes.to_numpy(), codigos[codigos >= 0]))
+    linhas = linhas[(df_hist['laudo_tecnico'].iloc[linhas] == 'N/D').to_numpy()]
+    if not len(linhas): return df_hist
+    valores = [laudos[c] for c in chave.iloc[linhas]]
+    categories, codigos_laudo = _extend_categories(df_hist['laudo_tecnico'], valores)
+    codigos_laudo = codigos_laudo.copy()
+    codigos_laudo[linhas] = _category_codes(categories, valores)
+    return df_hist.assign(laudo_tecnico=_categorical(codigos_laudo, categories))
+
+def _concat_compact(df_hist, df_rows):
+    """
+    Junta o histórico compacto com as linhas novas sem voltar as colunas category
+    para texto: as categorias ganham só os valores novos do delta e os códigos
+    inteiros do histórico são reaproveitados.
+    """
+    df = pd.concat([df_hist.drop(columns=CATEGORY_COLS), df_rows.drop(columns=CATEGORY_COLS)])
+    for col in CATEGORY_COLS:
+        categories, codigos = _extend_categories(df_hist[col], df_rows[col])
+        codigos = np.concatenate([codigos, _category_codes(categories, df_rows[col])])
+        df[col] = _categorical(codigos, categories)
+    return df[df_hist.columns]
+
+@profiled("histórico: chave única do delta")
+def merge_keyed_delta(state, df_delta, unique_key_cols):
+    """
+    Aplica as linhas inéditas sobre um estado de build_keyed_state, atualizando
+    os mapas mestres só com as chaves novas. O resultado é o mesmo de reprocessar
+    histórico + delta do zero; chave, mapas, órfãos e a posição das linhas no
+    histórico ordenado são calculados só para o delta.
+    """
+    stats = dict(state["stats"])
+    clientes, laudos = dict(state["clientes"]), dict(state["laudos"])
+    stats["rows_read"] += len(df_delta)
+    if df_delta.empty: return {**state, "stats": stats}
+
+    df_delta = df_delta.copy()
+    df_delta['chave'] = build_chave(df_delta, unique_key_cols)
+    df_delta = drop_empty_keys(df_delta)
+    stats["rows_after_key_drop"] += len(df_delta)
+
+    novos_clientes = master_map(df_delta[[c not in clientes for c in df_delta['chave']]], 'cliente').to_dict()
+    novos_laudos = master_map(df_delta[[c not in laudos for c in df_delta['chave']]], 'laudo_tecnico').to_dict()
+    sem_laudos_antes = not laudos
+    clientes.update(novos_clientes); laudos.update(novos_laudos)
+
+    # Órfãos do histórico cujo cliente apareceu agora voltam para os dados válidos.
+    df_orfaos = state["orfaos"]
+    adotados = df_orfaos['chave'].isin(novos_clientes.keys())
+    df_rows = pd.concat([df_orfaos[adotados], df_delta])
+    df_rows['cliente'] = [clientes.get(c) for c in df_rows['chave']]
+    if laudos: df_rows['laudo_tecnico'] = [laudos.get(c) for c in df_rows['chave']]
+    df_orfaos = pd.concat([df_orfaos[~adotados], df_rows[df_rows['cliente'].isna()]])
+    df_rows = df_rows.dropna(subset=['cliente'])
+    df_rows['laudo_tecnico'] = df_rows['laudo_tecnico'].fillna('N/D')
+
+    df_hist = state["df"]
+    if sem_laudos_antes and laudos:
+        # Primeiro laudo do histórico: como no processamento do zero, todas as linhas passam pelo mapa.
+        df_hist = df_hist.assign(laudo_tecnico=df_hist['chave'].astype(object).map(laudos).fillna('N/D'))
+    elif novos_laudos:
+        df_hist = _fill_new_laudos(df_hist, laudos, novos_laudos)
+
+    df_rows, posicoes = _insert_positions(df_hist, df_rows)
+    df_full = _concat_compact(df_hist, df_rows)
+    n_hist = len(df_hist)
+    df_full = df_full.take(np.insert(np.arange(n_hist), posicoes, np.arange(n_hist, len(df_full))))
+    stats["rows_after_orphans_drop"] = len(df_full)
+
+    return {"df": df_full, "orfaos": df_orfaos, "stats": stats, "clientes": clientes, "laudos": laudos}
+
+@st.cache_resource(max_entries=4)
+def _keyed_history(unique_key_cols):
+    # Estado compartilhado entre sessões; cada combinação de campos da chave tem o seu.
+    return {"lock": threading.Lock(), "state": None, "parts": 0}
+
+def load_history_data(file_hash, unique_key_cols, df_new):
+    """
+    Acrescenta o arquivo enviado ao histórico (uma única vez por arquivo) e
+    devolve o histórico acumulado já com a chave única, como load_and_process_data.
+    """
+    append_to_history(df_new, file_hash)
+    holder = _keyed_history(unique_key_cols)
+    with holder["lock"]:
+        manifest = history_manifest()
+        if manifest["rows"] == 0: return pd.DataFrame(), {}
+        if holder["state"] is None:
+            df_hist = read_history_parts(manifest["parts"])
+            holder["state"] = build_keyed_state(df_hist, {"rows_read": len(df_hist)}, list(unique_key_cols))
+        elif len(manifest["parts"]) > holder["parts"]:
+            df_delta = read_history_parts(manifest["parts"][holder["parts"]:])
+            holder["state"] = merge_keyed_delta(holder["state"], df_delta, list(unique_key_cols))
+        holder["parts"] = len(manifest["parts"])
+        state = holder["state"]
+    return state["df"], state["stats"]
@@ -0,0 +1,93 @@
+import pandas as pd
+from disk_cache import file_fingerprint, load_cached_frame, save_cached_frame
+from excel_reader import read_workbook_sheets
+from profiling import profile_stage, profiled
+
+# Leitura do Excel e montagem da chave única, sem dependência do Streamlit:
+# o app envolve estas funções nos seus caches e o lote (batch_report.py) as usa direto.
+
+@profiled("leitura do Excel")
+def parse_workbook(file_bytes, max_workers=None):
+    """
+    Lê as abas do Excel e devolve o DataFrame unificado e limpo, ainda sem a
+    chave única. Esta é a etapa cara e não depende dos campos de chave.
+    """
+    all_data = read_workbook_sheets(file_bytes, max_workers)
+    if not all_data: return pd.DataFrame(), {}
+
+    df_full = pd.concat(all_data, ignore_index=True)
+    return df_full, {"rows_read": len(df_full)}
+
+def load_workbook_frame(file_bytes):
+    """
+    Igual a parse_workbook, mas consulta antes o cache em disco (chaveado pelo
+    hash do conteúdo), para que o mesmo arquivo não seja lido duas vezes.
+    """
+    fingerprint = file_fingerprint(file_bytes)
+    with profile_stage("cache em disco: leitura"):
+        cached = load_cached_frame(fingerprint)
+    if cached is not None: return cached
+    df_full, stats = parse_workbook(file_bytes)
+    if not df_full.empty:
+        with profile_stage("cache em disco: gravação"):
+            save_cached_frame(fingerprint, df_full, stats)
+    return df_full, stats
+
+# Colunas com poucos valores distintos (ou muito repetidos, como a chave) ficam
+# como category: cada linha guarda só um código inteiro e os textos ficam uma vez
+# só na tabela de categorias. Para a chave, o código é o id inteiro do item.
+CATEGORY_COLS = ["tipo_item", "etapa", "cliente", "laudo_tecnico", "chave"]
+
+def compact_frame(df):
+    return df.astype({col: "category" for col in CATEGORY_COLS})
+
+def build_chave(df, unique_key_cols):
+    return df['tipo_item'].astype(str).str.cat([df[col].astype(str) for col in unique_key_cols], sep="|")
+
+def drop_empty_keys(df):
+    return df[df['chave'].str.replace('|', '').str.strip().astype(bool)]
+
+def master_map(df, col):
+    """Primeiro valor não vazio de `col` para cada chave (mapa mestre)."""
+    df_com_valor = df[df[col].astype(str).str.strip() != '']
+    return df_com_valor.drop_duplicates('chave', keep='first').set_index('chave')[col]
+
+@profiled("chave única")
+def build_keyed_state(df_full, stats, unique_key_cols):
+    """
+    Monta a chave única e propaga cliente e laudo a partir dos orçamentos.
+    Retorna os dados válidos junto com os órfãos e os mapas mestres, que a
+    importação incremental reaproveita para não reprocessar o histórico.
+    """
+    stats = dict(stats)
+    df_full = df_full.copy()
+    df_full['chave'] = build_chave(df_full, unique_key_cols)
+    df_full = drop_empty_keys(df_full)
+    stats["rows_after_key_drop"] = len(df_full)
+
+    mapa_mestre_clientes = master_map(df_full, 'cliente')
+    df_full['cliente'] = df_full['chave'].map(mapa_mestre_clientes)
+
+    mapa_mestre_laudos = master_map(df_full, 'laudo_tecnico')
+    if not mapa_mestre_laudos.empty:
+        df_full['laudo_tecnico'] = df_full['chave'].map(mapa_mestre_laudos)
+
+    df_orfaos = df_full[df_full['cliente'].isna()]
+    df_full.dropna(subset=['cliente'], inplace=True)
+    df_full['laudo_tecnico'] = df_full['laudo_tecnico'].fillna('N/D')
+    stats["rows_after_orphans_drop"] = len(df_full)
+
+    return {
+        # Ordenação estável: datas iguais ficam na ordem de leitura, o que permite à
+        # importação incremental inserir linhas novas na posição certa.
+        "df": compact_frame(df_full.sort_values("data_inicio", kind="stable")), "orfaos": df_orfaos, "stats": stats,
+        "clientes": mapa_mestre_clientes.to_dict(), "laudos": mapa_mestre_laudos.to_dict(),
+    }
+
+def apply_unique_key(df_full, stats, unique_key_cols):
+    """
+    Monta a chave única e propaga cliente e laudo a partir dos orçamentos,
+    descartando linhas sem chave e itens órfãos.
+    """
+    state = build_keyed_state(df_full, stats, unique_key_cols)
+    return state["df"], state["stats"]
@@ -0,0 +1,141 @@
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+# Instrumentação opcional de tempo e memória por etapa. Ligada com BI_PROFILE=1
+# (ou ?profile=1 na URL do app); BI_PROFILE=tempo mede só o tempo, sem o custo
+# do tracemalloc. Com BI_PROFILE_LOG, cada execução é acrescentada ao arquivo
+# como uma linha JSON. Não depende do Streamlit: as etapas dos módulos de dados
+# usam profile_stage() e só são medidas quando há um StageProfiler ativo na thread.
+
+PROFILE_ENV = os.environ.get("BI_PROFILE", "").strip().lower()
+PROFILE_ENABLED = PROFILE_ENV not in ("", "0", "false")
+PROFILE_LOG = os.environ.get("BI_PROFILE_LOG") or None
+
+_active = threading.local()
+
+# O tracemalloc é do processo inteiro (e reset_peak também): só um profiler por
+# vez mede memória; os de outras sessões, enquanto ele estiver ativo, medem só o
+# tempo. O tracemalloc é desligado quando esse profiler para, em qualquer thread.
+_memory_lock = threading.Lock()
+_memory_owner = None
+_started_tracing = False
+
+def _claim_memory(profiler):
+    global _memory_owner, _started_tracing
+    with _memory_lock:
+        if _memory_owner is not None: return False
+        _memory_owner = profiler
+        _started_tracing = not tracemalloc.is_tracing()
+        if _started_tracing: tracemalloc.start()
+        return True
+
+def _release_memory(profiler):
+    global _memory_owner, _started_tracing
+    with _memory_lock:
+        if _memory_owner is not profiler: return
+        _memory_owner = None
+        # Não desliga um tracemalloc que já estava ligado por outro motivo (ex.: benchmarks).
+        if _started_tracing and tracemalloc.is_tracing(): tracemalloc.stop()
+        _started_tracing = False
+
+class StageProfiler:
+    """
+    Registra duração e pico de memória (acima do uso no início da etapa) de
+    cada etapa medida. Etapas aninhadas são registradas com o nível de
+    profundidade; o pico da etapa externa inclui o das internas.
+    """
+
+    def __init__(self, track_memory=True, log_path=PROFILE_LOG):
+        self.track_memory = track_memory
+        self.log_path = Path(log_path) if log_path else None
+        self.memory_busy = False
+        self.records = []
+        self._stack = []
+
+    def _traced(self):
+        return tracemalloc.get_traced_memory() if self.track_memory and tracemalloc.is_tracing() else (0, 0)
+
+    @contextmanager
+    def stage(self, name):
+        current, peak = self._traced()
+        # reset_peak apaga o pico da etapa externa; guarda-o antes de zerar.
+        if self._stack: self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+        if self.track_memory and tracemalloc.is_tracing(): tracemalloc.reset_peak()
+        entry = {"depth": len(self._stack), "start_mem": current, "peak": current}
+        # O registro entra na ordem de início, para a etapa externa vir antes das internas.
+        record = {"stage": name, "depth": entry["depth"], "seconds": None, "peak_mb": None}
+        self.records.append(record)
+        self._stack.append(entry)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["seconds"] = round(time.perf_counter() - inicio, 4)
+            self._stack.pop()
+            peak = max(entry["peak"], self._traced()[1])
+            if self._stack: self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            if self.track_memory:
+                record["peak_mb"] = round(max(peak - entry["start_mem"], 0) / 1024 / 1024, 2)
+
+    def write_log(self, **context):
+        """Acrescenta as etapas medidas ao arquivo de log (uma linha JSON por execução)."""
+        if not self.log_path or not self.records: return
+        linha = {"time": datetime.datetime.now().isoformat(timespec="seconds"), **context, "stages": self.records}
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(linha, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            pass
+
+def start_profiling(track_memory=None, log_path=PROFILE_LOG):
+    """
+    Ativa um StageProfiler novo para a thread atual (uma execução do app ou do
+    lote). Se outro profiler já estiver medindo memória, este mede só o tempo
+    (track_memory fica False e memory_busy True).
+    """
+    # Um profiler que ficou ativo nesta thread (execução interrompida) é encerrado antes.
+    stop_profiling()
+    if track_memory is None: track_memory = PROFILE_ENV != "tempo"
+    profiler = StageProfiler(track_memory=False, log_path=log_path)
+    profiler.track_memory = track_memory and _claim_memory(profiler)
+    profiler.memory_busy = track_memory and not profiler.track_memory
+    _active.profiler = profiler
+    return profiler
+
+def stop_profiling():
+    """Desativa o profiler da thread e desliga o tracemalloc se era ele que o usava."""
+    profiler = getattr(_active, "profiler", None)
+    _active.profiler = None
+    if profiler is not None: _release_memory(profiler)
+    return profiler
+
+def current_profiler():
+    return getattr(_active, "profiler", None)
+
+@contextmanager
+def profile_stage(name):
+    """Mede o bloco como uma etapa, se houver profiler ativo; caso contrário não faz nada."""
+    profiler = getattr(_active, "profiler", None)
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+def profiled(name):
+    """Decorador equivalente a envolver a função em profile_stage(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+SEARCH_COLS = ["nota_fiscal", "numero_serie", "numero_lacre"]
+NGRAM = 3
+
+class ItemSearchIndex:
+    """
+    Índice de busca do Explorador de Itens sobre NF, série e lacre.
+    Trabalha sobre os valores distintos das três colunas: trigramas para a busca
+    por trecho, lista ordenada para prefixo/exato e uma tabela valor → chaves.
+    """
+
+    def __init__(self, df, cols=SEARCH_COLS):
+        pairs = pd.concat([df[[col, 'chave']].set_axis(['valor', 'chave'], axis=1) for col in cols], ignore_index=True)
+        pairs = pairs[pairs['valor'].astype(str) != ''].drop_duplicates()
+        value_codes, values = pd.factorize(pairs['valor'].astype(str), sort=True)
+        chave_codes, self.chaves = pd.factorize(pairs['chave'])
+        self.values = np.asarray(values, dtype=object)
+
+        # valor → chaves, agrupado por valor para recuperar faixas com searchsorted.
+        order = np.argsort(value_codes, kind="stable")
+        self._pair_values, self._pair_chaves = value_codes[order], chave_codes[order]
+
+        # trigrama → valores que o contêm.
+        values_s = pd.Series(self.values, dtype=object)
+        lengths = values_s.str.len().to_numpy()
+        grams, gram_values = [], []
+        for pos in range(int(lengths.max(initial=0)) - NGRAM + 1):
+            ok = lengths >= pos + NGRAM
+            grams.append(values_s[ok].str[pos:pos + NGRAM].to_numpy(dtype=object))
+            gram_values.append(np.flatnonzero(ok))
+        grams = np.concatenate(grams) if grams else np.array([], dtype=object)
+        gram_values = np.concatenate(gram_values) if gram_values else np.array([], dtype=np.int64)
+        gram_codes, gram_uniques = pd.factorize(grams)
+        gram_df = pd.DataFrame({"g": gram_codes, "v": gram_values}).drop_duplicates().sort_values(["g", "v"])
+        self._gram_ids = {g: i for i, g in enumerate(gram_uniques)}
+        self._gram_values = gram_df['v'].to_numpy()
+        self._gram_starts = np.searchsorted(gram_df['g'].to_numpy(), np.arange(len(gram_uniques) + 1))
+
+    def _contains(self, term):
+        if len(term) < NGRAM:
+            hits = pd.Series(self.values, dtype=object).str.contains(term, regex=False).to_numpy()
+            return np.flatnonzero(hits)
+        candidates = None
+        for gram in {term[i:i + NGRAM] for i in range(len(term) - NGRAM + 1)}:
+            gid = self._gram_ids.get(gram)
+            if gid is None: return np.array([], dtype=np.int64)
+            posting = self._gram_values[self._gram_starts[gid]:self._gram_starts[gid + 1]]
+            candidates = posting if candidates is None else np.intersect1d(candidates, posting, assume_unique=True)
+            if len(candidates) == 0: return candidates
+        if len(term) == NGRAM: return candidates
+        hits = pd.Series(self.values[candidates], dtype=object).str.contains(term, regex=False).to_numpy()
+        return candidates[hits]
+
+    def _prefix(self, term):
+        start = np.searchsorted(self.values, term, side="left")
+        end = np.searchsorted(self.values, term + "\uffff", side="left")
+        return np.arange(start, end)
+
+    def _exact(self, term):
+        pos = np.searchsorted(self.values, term, side="left")
+        return np.arange(pos, pos + 1) if pos < len(self.values) and self.values[pos] == term else np.array([], dtype=np.int64)
+
+    def search(self, term, mode="contém", limit=None):
+        """
+        Retorna (chaves, total): as chaves encontradas (no máximo `limit`) e o total
+        antes do limite. `term` já deve estar limpo com clean_key_text; `mode` é
+        "contém", "começa com" ou "exato".
+        """
+        if not term: return [], 0
+        value_ids = {"contém": self._contains, "começa com": self._prefix, "exato": self._exact}[mode](term)
+        starts = np.searchsorted(self._pair_values, value_ids, side="left")
+        lengths = np.searchsorted(self._pair_values, value_ids, side="right") - starts
+        idx = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        chave_codes = np.unique(self._pair_chaves[idx])
+        return list(self.chaves[chave_codes[:limit]]), len(chave_codes)
@@ -1,36 +1,38 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from utils import memoize_view, paginated_dataframe
 
-def render_divergence_tab(data_df):
+def compute_divergences(data_df, lifecycle):
+    """Linhas dos itens parados entre etapas e o ranking dos clientes de cada grupo."""
+    orc, rec, fin = (lifecycle[f'{prefixo}_qtd'] > 0 for prefixo in ('orc', 'rec', 'fin'))
+    df_leak = data_df.loc[lifecycle.loc[orc & ~rec, 'idx_primeira_linha']]
+    df_wip = data_df.loc[lifecycle.loc[rec & ~fin, 'idx_ultima_linha']]
+    fig_leak = px.bar(df_leak['cliente'].value_counts().loc[lambda c: c > 0].nlargest(5)) if not df_leak.empty else None
+    fig_wip = px.bar(df_wip['cliente'].value_counts().loc[lambda c: c > 0].nlargest(5)) if not df_wip.empty else None
+    return {"df_leak": df_leak, "df_wip": df_wip, "fig_leak": fig_leak, "fig_wip": fig_wip}
+
+def render_divergence_tab(data_df, lifecycle, filter_key):
     st.markdown("<h2 class='section-header'>Análise de Divergências no Processo</h2>", unsafe_allow_html=True)
     st.info("Esta análise mostra itens que 'vazaram' do funil ou que pularam etapas, ajudando a identificar perdas de negócio ou falhas de processo.", icon="💡")
 
-    orc_chaves = set(data_df[data_df['etapa'] == 'Orçamento']['chave'].unique())
-    rec_chaves = set(data_df[data_df['etapa'] == 'Recarga']['chave'].unique())
-    fin_chaves = set(data_df[data_df['etapa'] == 'Finalização']['chave'].unique())
-    
-    orc_sem_rec = orc_chaves - rec_chaves
-    rec_sem_fin = rec_chaves - fin_chaves
-    
+    res = memoize_view(filter_key, "divergencias", compute_divergences, data_df, lifecycle)
+    df_leak, df_wip = res["df_leak"], res["df_wip"]
+
     col1, col2 = st.columns(2)
 
     with col1:
-        with st.expander(f"Orçados que não viraram Recarga ({len(orc_sem_rec)} itens)"):
-            if orc_sem_rec:
-                df_leak = data_df[data_df['chave'].isin(orc_sem_rec)].drop_duplicates('chave')
-                st.dataframe(df_leak[['cliente', 'nota_fiscal', 'numero_serie', 'numero_lacre']])
-                
+        with st.expander(f"Orçados que não viraram Recarga ({len(df_leak)} itens)"):
+            if not df_leak.empty:
+                paginated_dataframe(df_leak[['cliente', 'nota_fiscal', 'numero_serie', 'numero_lacre']], key="tabela_vazados")
+
                 st.markdown("###### Clientes com mais orçamentos parados:")
-                fig = px.bar(df_leak['cliente'].value_counts().nlargest(5))
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(res["fig_leak"], use_container_width=True)
 
     with col2:
-        with st.expander(f"Em Recarga e não Finalizados ({len(rec_sem_fin)} itens)"):
-            if rec_sem_fin:
-                df_wip = data_df[data_df['chave'].isin(rec_sem_fin)].drop_duplicates('chave', keep='last')
-                st.dataframe(df_wip[['cliente', 'nota_fiscal', 'numero_serie', 'numero_lacre', 'etapa']])
-                
+        with st.expander(f"Em Recarga e não Finalizados ({len(df_wip)} itens)"):
+            if not df_wip.empty:
+                paginated_dataframe(df_wip[['cliente', 'nota_fiscal', 'numero_serie', 'numero_lacre', 'etapa']], key="tabela_em_andamento")
+
                 st.markdown("###### Clientes com mais itens em andamento:")
-                fig = px.bar(df_wip['cliente'].value_counts().nlargest(5))
-                st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+                st.plotly_chart(res["fig_wip"], use_container_width=True)
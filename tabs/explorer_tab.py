@@ -1,27 +1,34 @@
 import streamlit as st
-import re
-import pandas as pd
+from search_index import ItemSearchIndex, NGRAM
+from utils import clean_key_text, paginated_dataframe
 
-def render_explorer_tab(df_main):
+# Termos curtos casam com muitos itens; limita o resultado para não travar a tela.
+SHORT_TERM_LIMIT = 200
+
+@st.cache_resource(show_spinner="Indexando itens para a busca...", max_entries=4)
+def get_search_index(dataset_key, _df_main):
+    return ItemSearchIndex(_df_main)
+
+def render_explorer_tab(df_main, dataset_key):
     st.markdown("<h2 class='section-header'>Explorador de Itens</h2>", unsafe_allow_html=True)
     st.info("Digite qualquer parte de uma Nota Fiscal, Nº de Série ou Lacre para ver o histórico completo do item.", icon="🔎")
-    
-    def clean_key_text(text):
-        if pd.isna(text): return ""
-        s = str(text).replace('.0', '')
-        return re.sub(r'[^A-Z0-9]', '', s.upper())
 
-    search_term = st.text_input("Buscar item específico:", placeholder="Ex: 17849 ou ABC01...")
-    
+    c1, c2 = st.columns([3, 1])
+    search_term = c1.text_input("Buscar item específico:", placeholder="Ex: 17849 ou ABC01...")
+    search_mode = c2.radio("Modo de busca:", ["contém", "começa com", "exato"], horizontal=True)
+
     if search_term:
         term = clean_key_text(search_term)
-        mask = df_main.apply(lambda row: term in row['nota_fiscal'] or term in row['numero_serie'] or term in row['numero_lacre'], axis=1)
-        result_df = df_main[mask]
-        
-        if result_df.empty:
+        limit = SHORT_TERM_LIMIT if len(term) < NGRAM else None
+        chaves_encontradas, total = get_search_index(dataset_key, df_main).search(term, search_mode, limit)
+
+        if not chaves_encontradas:
             st.warning("Nenhum item encontrado.")
         else:
-            chaves_encontradas = result_df['chave'].unique()
-            st.write(f"Encontrado(s) {len(chaves_encontradas)} item(ns) único(s).")
+            if total > len(chaves_encontradas):
+                st.write(f"{total} itens únicos encontrados, exibindo {len(chaves_encontradas)}.")
+                st.caption(f"Termo muito curto: exibindo apenas os primeiros {SHORT_TERM_LIMIT} itens. Digite mais caracteres para refinar.")
+            else:
+                st.write(f"Encontrado(s) {total} item(ns) único(s).")
             final_result_df = df_main[df_main['chave'].isin(chaves_encontradas)].sort_values(["chave", "data_inicio"])
-            st.dataframe(final_result_df)
\ No newline at end of file
+            paginated_dataframe(final_result_df, key="tabela_explorador")
@@ -1,12 +1,12 @@
 import streamlit as st
 import plotly.express as px
-from utils import calculate_lead_times
+from utils import calculate_lead_times, memoize_view
 
-def render_lead_time_tab(data_df):
+def render_lead_time_tab(lifecycle, filter_key):
     st.markdown("<h2 class='section-header'>Análise de Performance do Processo (Lead Time)</h2>", unsafe_allow_html=True)
     st.info("Lead Time (ou Tempo de Ciclo) é o tempo em dias que um item leva para passar de uma etapa para outra. Use isso para encontrar gargalos e medir a eficiência.", icon="💡")
     
-    df_lead = calculate_lead_times(data_df)
+    df_lead = memoize_view(filter_key, "lead_time", calculate_lead_times, lifecycle)
     
     if df_lead.empty or df_lead.drop(columns=['chave']).isnull().all().all():
         st.info("Não há dados suficientes para calcular o tempo entre etapas com os filtros atuais.")
@@ -1,22 +1,38 @@
 import streamlit as st
-from utils import identify_critical_items, highlight_critical
+import pandas as pd
+from th_expiry import ThExpiryIndex
+from utils import identify_critical_items, highlight_critical, memoize_view, paginated_dataframe
 
-def render_risk_tab(data_df, keys):
+def _destacar(crit_tipo):
+    """Colore dias_vencido com a cor da classificação da tabela (crit_tipo de identify_critical_items)."""
+    return lambda styler: styler.map(lambda dias: highlight_critical(crit_tipo) if pd.notna(dias) else '', subset=['dias_vencido'])
+
+def render_risk_tab(data_df, lifecycle, keys, filter_key):
     st.markdown("<h2 class='section-header'>Monitoramento de Riscos e Prazos de TH</h2>", unsafe_allow_html=True)
-    df_crit = identify_critical_items(data_df)
-    
+    c1, c2 = st.columns(2)
+    data_ref = pd.Timestamp(c1.date_input("Data de referência:", value=pd.Timestamp.now().date(), format="DD/MM/YYYY"))
+    horizonte = c2.number_input("Vencimentos nos próximos (dias):", min_value=1, value=90, step=30)
+
+    th_index = memoize_view(filter_key, "indice_th", ThExpiryIndex, lifecycle)
+    df_crit = memoize_view(filter_key, f"criticos|{data_ref.date()}", identify_critical_items, data_df, lifecycle, data_ref, th_index)
+
     if df_crit.empty:
         st.success("Nenhum item com risco de vencimento de teste hidrostático encontrado.", icon="✅")
     else:
         crit_tipos = df_crit.crit_tipo.unique()
         cols_to_show = ['cliente'] + keys + ['data_th', 'dias_vencido']
-        
+
         if "TH quase vencido" in crit_tipos:
             st.markdown("##### ⚠️ Quase Vencido")
             df_q = df_crit[df_crit.crit_tipo == "TH quase vencido"]
-            st.dataframe(df_q[cols_to_show].style.map(highlight_critical, subset=['dias_vencido']))
-            
+            paginated_dataframe(df_q[cols_to_show], key="tabela_th_quase_vencido", style=_destacar("TH quase vencido"))
+
         if "TH vencido" in crit_tipos:
             st.markdown("##### 🔥 Vencido")
             df_v = df_crit[df_crit.crit_tipo == "TH vencido"]
-            st.dataframe(df_v[cols_to_show].style.map(highlight_critical, subset=['dias_vencido']))
\ No newline at end of file
+            paginated_dataframe(df_v[cols_to_show], key="tabela_th_vencido", style=_destacar("TH vencido"))
+
+    df_proximos = th_index.expiring_within(horizonte, data_ref)
+    st.markdown(f"##### 📅 Vencem nos próximos {horizonte} dias ({len(df_proximos)} itens)")
+    if not df_proximos.empty:
+        paginated_dataframe(df_proximos[['cliente', 'tipo_item', 'chave', 'data_th', 'vencimento_th']], key="tabela_th_proximos")
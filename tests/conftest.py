@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+RAW_COLS = ["nota_fiscal", "numero_serie", "numero_lacre", "cliente", "laudo_tecnico", "data_th", "data_inicio", "tipo_item", "etapa"]
+
+def raw_frame(rows):
+    """Frame no formato de parse_workbook a partir de tuplas na ordem de RAW_COLS."""
+    df = pd.DataFrame(rows, columns=RAW_COLS)
+    for col in ("data_th", "data_inicio"):
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+@pytest.fixture
+def df_raw():
+    d = pd.Timestamp
+    return raw_frame([
+        ("100", "S1", "L1", "ACME", "OK", d("2015-01-01"), d("2024-01-01"), "Ampola", "Orçamento"),
+        ("100", "S1", "L1", "", "", d("2015-01-01"), d("2024-01-10"), "Ampola", "Recarga"),
+        ("100", "S1", "L1", "", "", d("2015-01-01"), d("2024-01-20"), "Ampola", "Finalização"),
+        ("200", "S2", "L2", "GAMA", "RUIM", None, d("2024-02-01"), "Ampola", "Orçamento"),
+        ("300", "S3", "L3", "GAMA", "", d("2010-05-01"), d("2024-03-01"), "Tanque Pressurizado", "Orçamento"),
+        ("300", "S3", "L3", "", "", d("2010-05-01"), d("2024-03-05"), "Tanque Pressurizado", "Recarga"),
+    ])
+
+def synthetic_raw(n, seed=0, first_item=0, first_label=0, laudos=True):
+    """
+    n linhas aleatórias de ~n/3 itens a partir de first_item, com cliente e laudo
+    só em parte das linhas (órfãos e itens sem laudo) e datas com repetições.
+    """
+    rng = np.random.default_rng(seed)
+    item = first_item + rng.integers(0, max(n // 3, 1), n)
+    etapas = np.array(["Orçamento", "Recarga", "Finalização"])
+    df = pd.DataFrame({
+        "nota_fiscal": (item // 2).astype(str), "numero_serie": "S" + item.astype(str), "numero_lacre": (item % 997).astype(str),
+        "cliente": np.where(rng.random(n) < 0.4, "C" + (item % 300).astype(str), ""),
+        "laudo_tecnico": np.where(laudos & (rng.random(n) < 0.3), "L" + (item % 7).astype(str), ""),
+        "data_th": pd.Timestamp("2015-01-01") + pd.to_timedelta(item % 3000, "D"),
+        "data_inicio": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, n), "D"),
+        "tipo_item": np.where(item % 2, "Ampola", "Tanque Pressurizado"), "etapa": etapas[rng.integers(0, 3, n)],
+    })
+    df.loc[rng.random(n) < 0.01, "data_inicio"] = pd.NaT
+    return df.set_axis(pd.RangeIndex(first_label, first_label + n))
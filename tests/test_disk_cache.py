@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+import disk_cache
+from disk_cache import file_fingerprint, load_cached_frame, save_cached_frame
+
+@pytest.fixture(autouse=True)
+def _cache_temporario(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "CACHE_DIR", tmp_path)
+
+def test_versao_do_formato_invalida_o_cache(tmp_path, monkeypatch):
+    fingerprint = file_fingerprint(b"planilha")
+    df = pd.DataFrame({"nota_fiscal": ["1", "2"]})
+    save_cached_frame(fingerprint, df, {"rows_read": 2})
+    assert load_cached_frame(fingerprint)[0].equals(df)
+
+    monkeypatch.setattr(disk_cache, "CACHE_FORMAT_VERSION", disk_cache.CACHE_FORMAT_VERSION + 1)
+    assert load_cached_frame(fingerprint) is None
+
+    # Ao gravar na versão nova, os arquivos da anterior são removidos.
+    save_cached_frame(fingerprint, df, {"rows_read": 2})
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(p.name for p in disk_cache._paths(fingerprint))
@@ -0,0 +1,21 @@
+import io
+
+import pandas as pd
+
+from conftest import synthetic_raw
+from exports import export_frame
+from ingest import apply_unique_key
+
+def test_parquet_leva_so_as_categorias_da_visao():
+    df_raw = synthetic_raw(3_000)
+    df_main, _ = apply_unique_key(df_raw, {"rows_read": len(df_raw)}, ["nota_fiscal", "numero_serie", "numero_lacre"])
+    visao = df_main.head(5)
+
+    lido = pd.read_parquet(io.BytesIO(export_frame(visao, "parquet")))
+    for col in ("chave", "cliente", "tipo_item", "etapa", "laudo_tecnico"):
+        assert set(lido[col].astype("category").cat.categories) == set(visao[col].astype(object))
+        if isinstance(lido[col].dtype, pd.CategoricalDtype):
+            assert len(lido[col].cat.categories) == visao[col].nunique()
+    pd.testing.assert_frame_equal(lido.astype(object), visao.reset_index(drop=True).astype(object))
+    # O DataFrame compartilhado (df_main) não é alterado.
+    assert len(df_main["chave"].cat.categories) == df_main["chave"].nunique()
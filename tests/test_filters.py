@@ -0,0 +1,30 @@
+import numpy as np
+
+from analytics import build_item_lifecycle
+from data_processing import filter_view
+from ingest import apply_unique_key
+from tabs.divergence_tab import compute_divergences
+
+def test_nf_sem_resultado_fora_da_chave(df_raw):
+    # Com a NF fora da chave o ciclo de vida é recalculado sobre a visão, que fica vazia.
+    keys = ["numero_serie"]
+    df_main, _ = apply_unique_key(df_raw, {"rows_read": len(df_raw)}, keys)
+    lifecycle = build_item_lifecycle(df_main)
+
+    visao = filter_view(df_main, lifecycle, keys, "Todos", "Todos", "999999")
+    data_df = df_main.take(visao["linhas"])
+    assert data_df.empty
+    assert visao["lifecycle"].empty
+    assert list(visao["lifecycle"].columns) == list(lifecycle.columns)
+
+    res = compute_divergences(data_df, visao["lifecycle"])
+    assert res["df_leak"].empty and res["df_wip"].empty
+    assert res["fig_leak"] is None and res["fig_wip"] is None
+
+def test_nf_encontrada_fora_da_chave(df_raw):
+    keys = ["numero_serie"]
+    df_main, _ = apply_unique_key(df_raw, {"rows_read": len(df_raw)}, keys)
+    visao = filter_view(df_main, build_item_lifecycle(df_main), keys, "Todos", "Todos", "300")
+    res = compute_divergences(df_main.take(visao["linhas"]), visao["lifecycle"])
+    assert res["df_wip"]["numero_serie"].tolist() == ["S3"]
+    assert np.array_equal(visao["lifecycle"]["rec_qtd"].to_numpy(), [1])
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+import incremental
+import ingest
+from conftest import synthetic_raw
+from incremental import append_to_history, history_manifest, merge_keyed_delta, read_history_parts
+from ingest import build_keyed_state
+
+KEYS = ["nota_fiscal", "numero_serie", "numero_lacre"]
+
+def _do_zero(*partes):
+    df = pd.concat(partes)
+    return build_keyed_state(df, {"rows_read": len(df)}, KEYS)
+
+def _assert_mesmo_estado(incremental_state, zero):
+    pd.testing.assert_frame_equal(incremental_state["df"], zero["df"])
+    assert incremental_state["stats"] == zero["stats"]
+    assert incremental_state["clientes"] == zero["clientes"]
+    assert incremental_state["laudos"] == zero["laudos"]
+    assert sorted(incremental_state["orfaos"].index) == sorted(zero["orfaos"].index)
+
+@pytest.mark.parametrize("n_delta", [1, 50, 2_000])
+def test_merge_igual_ao_processamento_do_zero(n_delta):
+    historico = synthetic_raw(6_000)
+    # O delta repete parte dos itens do histórico (órfãos adotados, laudos novos) e traz itens novos.
+    delta = synthetic_raw(n_delta, seed=n_delta, first_item=1_500, first_label=len(historico))
+    state = build_keyed_state(historico, {"rows_read": len(historico)}, KEYS)
+    _assert_mesmo_estado(merge_keyed_delta(state, delta, KEYS), _do_zero(historico, delta))
+
+def test_merge_sucessivos_e_primeiro_laudo():
+    partes = [synthetic_raw(3_000, laudos=False)]
+    state = build_keyed_state(partes[0], {"rows_read": len(partes[0])}, KEYS)
+    for seed in range(1, 4):
+        inicio = sum(map(len, partes))
+        partes.append(synthetic_raw(300, seed=seed, first_item=800 * seed, first_label=inicio))
+        state = merge_keyed_delta(state, partes[-1], KEYS)
+        _assert_mesmo_estado(state, _do_zero(*partes))
+
+def test_merge_nao_reprocessa_o_historico(monkeypatch):
+    historico = synthetic_raw(20_000)
+    state = build_keyed_state(historico, {"rows_read": len(historico)}, KEYS)
+    delta = synthetic_raw(100, seed=1, first_item=6_000, first_label=len(historico))
+
+    # Registra ordenações e conversões de tipo feitas sobre algo do tamanho do histórico.
+    chamadas = []
+    def espiar(cls, nome, tamanho_minimo=len(state["df"])):
+        original = getattr(cls, nome)
+        def wrapper(self, *args, **kwargs):
+            if len(self) >= tamanho_minimo: chamadas.append(f"{cls.__name__}.{nome}{args[:1]}")
+            return original(self, *args, **kwargs)
+        monkeypatch.setattr(cls, nome, wrapper)
+    espiar(pd.DataFrame, "sort_values")
+    espiar(pd.Series, "sort_values")
+    espiar(pd.DataFrame, "astype")
+    espiar(pd.Series, "astype")
+    def proibido(*args, **kwargs): raise AssertionError("o merge não deve recompactar nem reprocessar o histórico")
+    monkeypatch.setattr(ingest, "compact_frame", proibido)
+    monkeypatch.setattr(incremental, "build_keyed_state", proibido)
+
+    merged = merge_keyed_delta(state, delta, KEYS)
+    assert chamadas == []
+    monkeypatch.undo()
+    _assert_mesmo_estado(merged, _do_zero(historico, delta))
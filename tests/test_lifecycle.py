@@ -0,0 +1,28 @@
+from collections import Counter
+
+from analytics import build_item_lifecycle, create_sankey_chart, transition_links
+from conftest import synthetic_raw
+from ingest import apply_unique_key
+
+def _df_main():
+    df_raw = synthetic_raw(4_000)
+    df_main, _ = apply_unique_key(df_raw, {"rows_read": len(df_raw)}, ["nota_fiscal", "numero_serie", "numero_lacre"])
+    return df_main
+
+def test_caminho_na_ordem_das_datas():
+    df_main = _df_main()
+    lifecycle = build_item_lifecycle(df_main)
+    # df_main já vem ordenado por data_inicio (estável, NaT por último).
+    esperado = df_main.groupby("chave", observed=True, sort=False)["etapa"].agg(lambda s: " → ".join(s.astype(str)))
+    assert lifecycle.set_index("chave")["caminho"].to_dict() == esperado.to_dict()
+    assert build_item_lifecycle(df_main.iloc[:0])["caminho"].empty
+
+def test_caminhos_batem_com_as_transicoes():
+    df_main = _df_main()
+    contagem = Counter()
+    for caminho in build_item_lifecycle(df_main)["caminho"]:
+        etapas = caminho.split(" → ")
+        contagem.update(zip(etapas, etapas[1:]))
+    links = transition_links(df_main, with_durations=True)
+    assert {(s, t): v for s, t, v in links[["source", "target", "value"]].itertuples(index=False)} == dict(contagem)
+    assert "transições" in create_sankey_chart(links).data[0].link.hovertemplate
@@ -0,0 +1,75 @@
+import threading
+import tracemalloc
+
+import pytest
+
+from profiling import current_profiler, profile_stage, start_profiling, stop_profiling
+
+@pytest.fixture(autouse=True)
+def _sem_profiler():
+    stop_profiling()
+    yield
+    stop_profiling()
+    if tracemalloc.is_tracing(): tracemalloc.stop()
+
+def test_para_o_tracemalloc_ao_encerrar():
+    profiler = start_profiling(track_memory=True, log_path=None)
+    with profile_stage("etapa"):
+        dados = list(range(100_000))
+    assert tracemalloc.is_tracing()
+    assert stop_profiling() is profiler
+    assert not tracemalloc.is_tracing()
+    assert profiler.records[0]["peak_mb"] > 0
+    del dados
+
+def test_execucao_interrompida_nao_deixa_o_tracemalloc_ligado():
+    start_profiling(track_memory=True, log_path=None)
+    with pytest.raises(RuntimeError):
+        try:
+            with profile_stage("etapa"):
+                raise RuntimeError("st.stop()")
+        finally:
+            stop_profiling()
+    assert current_profiler() is None
+    assert not tracemalloc.is_tracing()
+
+def test_novo_profiler_na_thread_encerra_o_anterior():
+    start_profiling(track_memory=True, log_path=None)
+    # O anterior libera o tracemalloc, então o novo pode medir memória.
+    novo = start_profiling(track_memory=True, log_path=None)
+    assert current_profiler() is novo and novo.track_memory
+    stop_profiling()
+    assert not tracemalloc.is_tracing()
+
+def test_sessoes_concorrentes_so_uma_mede_memoria():
+    primeiro_ativo, liberar = threading.Event(), threading.Event()
+    resultado = {}
+
+    def sessao_lenta():
+        resultado["primeiro"] = start_profiling(track_memory=True, log_path=None)
+        primeiro_ativo.set()
+        liberar.wait(5)
+        stop_profiling()
+
+    thread = threading.Thread(target=sessao_lenta)
+    thread.start()
+    primeiro_ativo.wait(5)
+    segundo = start_profiling(track_memory=True, log_path=None)
+    with profile_stage("etapa"):
+        pass
+    assert resultado["primeiro"].track_memory
+    assert not segundo.track_memory and segundo.memory_busy
+    assert segundo.records[0]["peak_mb"] is None
+
+    # A sessão que não mede memória não desliga o tracemalloc da outra.
+    stop_profiling()
+    assert tracemalloc.is_tracing()
+    liberar.set()
+    thread.join(5)
+    assert not tracemalloc.is_tracing()
+
+def test_nao_desliga_tracemalloc_ligado_por_outro_motivo():
+    tracemalloc.start()
+    start_profiling(track_memory=True, log_path=None)
+    stop_profiling()
+    assert tracemalloc.is_tracing()
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from analytics import build_item_lifecycle, highlight_critical, identify_critical_items
+from ingest import apply_unique_key
+from th_expiry import ThExpiryIndex
+
+def test_cores_seguem_os_prazos_configurados(df_raw):
+    df_main, _ = apply_unique_key(df_raw, {"rows_read": len(df_raw)}, ["nota_fiscal", "numero_serie", "numero_lacre"])
+    lifecycle = build_item_lifecycle(df_main)
+    ref = pd.Timestamp("2024-06-01")
+    # Prazos menores que os padrões: a Ampola com TH de 2015 já está vencida.
+    indice = ThExpiryIndex(lifecycle, prazos={"Ampola": (5, 4)})
+    criticos = identify_critical_items(df_main, lifecycle, ref, indice).set_index("tipo_item")
+
+    assert criticos.loc["Ampola", "crit_tipo"] == "TH vencido"
+    assert criticos.loc["Ampola", "dias_vencido"] < 365 * 10
+    cores = {tipo: highlight_critical(tipo) for tipo in criticos["crit_tipo"]}
+    assert cores["TH vencido"] and all(cores.values())
+    assert highlight_critical(None) == ''
@@ -0,0 +1,22 @@
+from conftest import synthetic_raw
+from ingest import apply_unique_key
+from search_index import ItemSearchIndex
+
+def _indice():
+    df_raw = synthetic_raw(3_000)
+    df_main, _ = apply_unique_key(df_raw, {"rows_read": len(df_raw)}, ["nota_fiscal", "numero_serie", "numero_lacre"])
+    return df_main, ItemSearchIndex(df_main)
+
+def test_total_antes_do_limite():
+    df_main, indice = _indice()
+    chaves, total = indice.search("1", "contém", limit=50)
+    esperado = df_main[df_main[["nota_fiscal", "numero_serie", "numero_lacre"]].apply(lambda c: c.str.contains("1")).any(axis=1)]["chave"].nunique()
+    assert len(chaves) == 50
+    assert total == esperado > 50
+
+def test_sem_limite_total_igual_ao_resultado():
+    _, indice = _indice()
+    for modo in ("contém", "começa com", "exato"):
+        chaves, total = indice.search("S12", modo)
+        assert total == len(chaves)
+    assert indice.search("", "contém") == ([], 0)
@@ -0,0 +1,43 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from text_cleaning import clean_key_series, clean_key_text, clean_text, clean_text_series
+
+VALORES_MISTOS = [
+    "ABC-123", " nf 17849 ", "17849.0", "1.05", "10.0.0", "v.0a", 17849, 0, -3, 17849.0, 12.5, 1e20,
+    np.nan, None, pd.NaT, float("nan"), "", "   ", "\tx\n", "ação", "Ação-ÇÃO", "é.0", "ß", "ﬁ",
+    datetime.datetime(2024, 1, 2, 3, 4, 5), pd.Timestamp("2023-12-31"), datetime.date(2024, 5, 6), True,
+]
+
+def _casos():
+    yield pd.Series(VALORES_MISTOS, dtype=object)
+    yield pd.Series(["a.0", " b ", "c", None, "a.0", "Ü.0x"], dtype="string")
+    yield pd.Series(["a.0", " b ", None, "ÂÊ"], dtype="str")
+    yield pd.Series([1, 2, 10, 100], dtype="int64")
+    yield pd.Series([1.0, 2.5, np.nan, 10.0, -0.0], dtype="float64")
+    yield pd.Series(pd.to_datetime(["2024-01-01 00:00", None, "2024-02-03 10:00"]))
+    yield pd.Series(["x", "y", "x", None], dtype="category")
+    yield pd.Series([], dtype=object)
+
+@pytest.mark.parametrize("serie", list(_casos()), ids=lambda s: str(s.dtype))
+@pytest.mark.parametrize("vetorizada, escalar", [(clean_key_series, clean_key_text), (clean_text_series, clean_text)], ids=["chave", "texto"])
+def test_equivale_ao_apply(serie, vetorizada, escalar):
+    serie = serie.set_axis(range(10, 10 + len(serie))).rename("coluna")
+    esperado = serie.apply(escalar)
+    resultado = vetorizada(serie)
+    assert resultado.tolist() == esperado.tolist()
+    assert resultado.index.equals(serie.index)
+    assert resultado.name == "coluna"
+
+def test_remove_todo_ponto_zero():
+    # A versão escalar remove qualquer '.0', não só o sufixo; a vetorizada deve fazer o mesmo.
+    serie = pd.Series(["17849.0", "10.05", "1.0.0", "A.0B", 17849.0])
+    assert clean_key_series(serie).tolist() == ["17849", "105", "1", "AB", "17849"]
+
+def test_espacos_e_acentos():
+    serie = pd.Series(["  nf 123 ", "\tação\n", "é", None])
+    assert clean_text_series(serie).tolist() == ["NF 123", "AÇÃO", "É", ""]
+    assert clean_key_series(serie).tolist() == ["NF123", "AO", "", ""]
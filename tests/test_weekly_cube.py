@@ -0,0 +1,31 @@
+import pytest
+
+from analytics import build_item_lifecycle, top_clientes
+from conftest import synthetic_raw
+from ingest import apply_unique_key
+from tabs.overview_tab import overview_report_data
+from weekly_cube import WeeklyCube
+
+@pytest.fixture(scope="module")
+def dados():
+    df_raw = synthetic_raw(4_000)
+    df_main, _ = apply_unique_key(df_raw, {"rows_read": len(df_raw)}, ["nota_fiscal", "numero_serie", "numero_lacre"])
+    return df_main, build_item_lifecycle(df_main), WeeklyCube(df_main)
+
+@pytest.mark.parametrize("painel", ["Todos", "Ampola", "Tanque Pressurizado"])
+def test_top_clientes_do_cubo_igual_ao_das_linhas(dados, painel):
+    df_main, lifecycle, cube = dados
+    if painel != "Todos": lifecycle = lifecycle[lifecycle["tipo_item"] == painel]
+    contagem = lifecycle["cliente"].value_counts()
+    # Há empates no corte do top 10: a ordem depende só do desempate definido.
+    assert (contagem == contagem.nlargest(10).iloc[-1]).sum() > 1
+
+    esperado = sorted(((int(v), str(c)) for c, v in contagem.items() if v > 0), key=lambda t: (-t[0], t[1]))[:10]
+    assert [(int(v), c) for c, v in cube.top_clientes(painel).items()] == esperado
+    assert [(int(v), c) for c, v in top_clientes(contagem).items()] == esperado
+
+def test_relatorio_igual_com_e_sem_cubo(dados):
+    _, lifecycle, cube = dados
+    com_cubo = overview_report_data(lifecycle, "Todos", "Todos", cube)["Top_10_Clientes"]
+    sem_cubo = overview_report_data(lifecycle, "Todos")["Top_10_Clientes"]
+    assert com_cubo.equals(sem_cubo)
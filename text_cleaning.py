@@ -0,0 +1,37 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Limpeza de texto usada na importação, na busca por NF e no explorador de itens.
+# As versões *_series são vetorizadas e produzem exatamente o mesmo resultado das
+# funções escalares aplicadas célula a célula (inclusive a remoção de todo '.0').
+
+def clean_key_text(text):
+    if pd.isna(text): return ""
+    s = str(text).replace('.0', '')
+    return re.sub(r'[^A-Z0-9]', '', s.upper())
+
+def clean_text(text):
+    if pd.isna(text): return ""
+    return str(text).strip().upper()
+
+def _clean_unique_values(series, transform):
+    """
+    Converte cada célula com str() (como a versão escalar), limpa apenas os
+    valores distintos e espalha o resultado de volta; células vazias viram "".
+    """
+    missing = series.isna().to_numpy()
+    codes, uniques = pd.factorize(series.astype(object).astype(str))
+    cleaned = transform(pd.Series(uniques, dtype=object).str).to_numpy(dtype=object)
+    out = np.full(len(series), "", dtype=object)
+    valid = (codes >= 0) & ~missing
+    out[valid] = cleaned[codes[valid]]
+    return pd.Series(out, index=series.index, name=series.name)
+
+def clean_key_series(series):
+    """Equivalente vetorizado de series.apply(clean_key_text)."""
+    return _clean_unique_values(series, lambda s: s.replace('.0', '', regex=False).str.upper().str.replace(r'[^A-Z0-9]', '', regex=True))
+
+def clean_text_series(series):
+    """Equivalente vetorizado de series.apply(clean_text)."""
+    return _clean_unique_values(series, lambda s: s.strip().str.upper())
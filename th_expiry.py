@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# Prazos do teste hidrostático por tipo de item: (anos até vencer, anos até o alerta).
+TH_PRAZOS_PADRAO = {
+    "Ampola": (10, 8.5),
+    "Tanque Pressurizado": (10, 8.5),
+    "Tanque Sem Pressão": (10, 8.5),
+}
+PRAZO_PADRAO = (10, 8.5)
+
+def _anos(anos):
+    return pd.to_timedelta(np.asarray(anos, dtype=float) * 365.25, unit="D")
+
+class ThExpiryIndex:
+    """
+    Itens (status mais recente de cada chave) ordenados pela data de vencimento
+    do TH, para responder "o que vence entre X e Y" com busca binária.
+    """
+
+    def __init__(self, lifecycle, prazos=None):
+        prazos = {**TH_PRAZOS_PADRAO, **(prazos or {})}
+        itens = lifecycle.dropna(subset=['data_th']) if not lifecycle.empty else pd.DataFrame(columns=['chave', 'tipo_item', 'data_th'])
+        tipos = itens['tipo_item'].astype(object)
+        data_th = pd.to_datetime(itens['data_th'])
+        vencimento = data_th + _anos(tipos.map({t: p[0] for t, p in prazos.items()}).fillna(PRAZO_PADRAO[0]))
+        alerta = data_th + _anos(tipos.map({t: p[1] for t, p in prazos.items()}).fillna(PRAZO_PADRAO[1]))
+        itens = itens.assign(data_th=data_th, vencimento_th=vencimento.to_numpy(), alerta_th=alerta.to_numpy())
+
+        self.itens = itens.sort_values('vencimento_th', kind='stable').reset_index(drop=True)
+        self._vencimentos = self.itens['vencimento_th'].to_numpy()
+        self._ordem_alerta = np.argsort(self.itens['alerta_th'].to_numpy(), kind='stable')
+        self._alertas = self.itens['alerta_th'].to_numpy()[self._ordem_alerta]
+
+    def _posicao(self, datas, data):
+        return np.searchsorted(datas, np.datetime64(pd.Timestamp(data)), side='left')
+
+    def expiring_between(self, inicio, fim):
+        """Itens cujo TH vence no intervalo [inicio, fim)."""
+        return self.itens.iloc[self._posicao(self._vencimentos, inicio):self._posicao(self._vencimentos, fim)]
+
+    def expiring_within(self, dias, reference_date=None):
+        ref = pd.Timestamp(reference_date).normalize() if reference_date is not None else pd.Timestamp.now().normalize()
+        return self.expiring_between(ref, ref + pd.Timedelta(days=dias))
+
+    def classify(self, reference_date=None):
+        """
+        Itens com TH vencido ou quase vencido na data de referência, com as colunas
+        crit_tipo e dias_vencido (dias desde o último TH).
+        """
+        ref = pd.Timestamp(reference_date).normalize() if reference_date is not None else pd.Timestamp.now().normalize()
+        n_vencidos = self._posicao(self._vencimentos, ref)
+        em_alerta = np.zeros(len(self.itens), dtype=bool)
+        em_alerta[self._ordem_alerta[:self._posicao(self._alertas, ref)]] = True
+        em_alerta[:n_vencidos] = True
+        criticos = self.itens[em_alerta].copy()
+        criticos['crit_tipo'] = np.where(np.arange(len(self.itens))[em_alerta] < n_vencidos, "TH vencido", "TH quase vencido")
+        criticos['dias_vencido'] = (ref - criticos['data_th']).dt.days
+        return criticos
@@ -1,11 +1,14 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import timedelta
-import io
 import base64
-import re
+from analytics import (
+    to_excel, detailed_report_sheets, generate_detailed_report, highlight_critical, top_clientes, agrupar_outros,
+    ETAPA_PREFIXOS, build_item_lifecycle, identify_critical_items, calculate_lead_times,
+    summarize_lead_times, transition_links, create_sankey_chart
+)
+from exports import export_frame
+from profiling import profile_stage
+from text_cleaning import clean_key_text
+from view_cache import FilterStateCache
 
 def display_logo(path="logo.png", height=80):
     try:
@@ -16,82 +19,71 @@ def display_logo(path="logo.png", height=80):
     except FileNotFoundError:
         pass
 
-def to_excel(df_to_export):
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        df_to_export.to_excel(writer, index=False, sheet_name="Dados")
-    return buf.getvalue()
+# Arquivos de download gerados só quando pedidos, guardados pela assinatura dos filtros ativos.
+@st.cache_data(show_spinner="Gerando arquivo de dados...", max_entries=16)
+def export_view(filter_key, fmt, _df):
+    with profile_stage(f"exportação: dados ({fmt})"):
+        return export_frame(_df, fmt)
 
-def generate_detailed_report(df, chart_data_dict):
-    report_sheets = chart_data_dict.copy()
-    
-    orc_chaves = set(df[df['etapa'] == 'Orçamento']['chave'].unique())
-    rec_chaves = set(df[df['etapa'] == 'Recarga']['chave'].unique())
-    fin_chaves = set(df[df['etapa'] == 'Finalização']['chave'].unique())
+@st.cache_data(show_spinner="Gerando relatório detalhado...", max_entries=16)
+def export_report(filter_key, _df, _lifecycle, _report_data):
+    with profile_stage("exportação: relatório detalhado"):
+        return generate_detailed_report(_df, _lifecycle, _report_data)
 
-    if orc_sem_rec_chaves := orc_chaves - rec_chaves:
-        report_sheets["Orcamento_sem_Recarga"] = df[df['chave'].isin(orc_sem_rec_chaves)].drop_duplicates('chave', keep='first')
-    if rec_sem_fin_chaves := rec_chaves - fin_chaves:
-        report_sheets["Recarga_sem_Finalizacao"] = df[df['chave'].isin(rec_sem_fin_chaves)].drop_duplicates('chave', keep='last')
-    if fin_sem_orc_chaves := fin_chaves - orc_chaves:
-        report_sheets["Finalizado_sem_Orcamento"] = df[df['chave'].isin(fin_sem_orc_chaves)].drop_duplicates('chave', keep='first')
+# Resultados por estado dos filtros, num LRU único do processo (compartilhado entre sessões).
+@st.cache_resource
+def get_view_cache():
+    return FilterStateCache()
 
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        for sheet_name, data in report_sheets.items():
-            if not data.empty:
-                data.to_excel(writer, index=False, sheet_name=sheet_name)
-    return buf.getvalue()
+def memoize_view(filter_key, name, compute, *args):
+    """
+    Retorna compute(*args), calculado uma vez por (filtros ativos, name) no cache
+    compartilhado. `name` deve incluir os parâmetros dos widgets que afetam o cálculo.
+    """
+    return get_view_cache().get_or_compute((filter_key, name), compute, *args)
 
-def highlight_critical(val):
-    if pd.isna(val): return ''
-    if val > 365*10: return 'background-color: #ff4d4d; color: white;'
-    if val > 365*8.5: return 'background-color: #ffa500; color: white;'
-    return ''
+# Tabelas grandes: o navegador recebe só a página visível, já ordenada e estilizada aqui.
+PAGE_SIZES = [25, 50, 100, 250]
+SEM_ORDENACAO = "(ordem atual)"
 
-def agrupar_outros(df_column, top_n=5):
-    if df_column.empty: return df_column
-    top_cats = df_column.value_counts().nlargest(top_n).index
-    return df_column.where(df_column.isin(top_cats), "Outros")
-
-def identify_critical_items(df):
-    if df.empty: return pd.DataFrame()
-    latest_status = df.sort_values("data_inicio", ascending=False).drop_duplicates(subset=['chave'], keep='first')
-    crit_list = []; today = pd.Timestamp.now().normalize()
-    ten_years, eight_half = timedelta(days=365.25 * 10), timedelta(days=365.25 * 8.5)
-    df_com_th = latest_status.dropna(subset=['data_th'])
-    for _, row in df_com_th.iterrows():
-        delta = today - row['data_th']
-        if delta > ten_years: crit_list.append({**row.to_dict(), "crit_tipo": "TH vencido", "dias_vencido": delta.days})
-        elif delta > eight_half: crit_list.append({**row.to_dict(), "crit_tipo": "TH quase vencido", "dias_vencido": delta.days})
-    return pd.DataFrame(crit_list)
+def _sort_positions(serie, ascending):
+    serie = serie.reset_index(drop=True)
+    try:
+        ordenada = serie.sort_values(ascending=ascending, kind="stable", na_position="last")
+    except TypeError:
+        # Colunas object com tipos misturados (ex.: lacre numérico e texto) ordenam como texto.
+        ordenada = serie.where(serie.isna(), serie.astype(str)).sort_values(ascending=ascending, kind="stable", na_position="last")
+    return ordenada.index.to_numpy()
 
-def calculate_lead_times(df):
-    if df.empty: return pd.DataFrame()
-    df_sorted = df.sort_values('data_inicio')
-    df_pivot = df_sorted.pivot_table(index='chave', columns='etapa', values='data_inicio', aggfunc='first')
-    if 'Orçamento' in df_pivot and 'Recarga' in df_pivot: df_pivot['Orçamento ➔ Recarga'] = (df_pivot['Recarga'] - df_pivot['Orçamento']).dt.days
-    if 'Recarga' in df_pivot and 'Finalização' in df_pivot: df_pivot['Recarga ➔ Finalização'] = (df_pivot['Finalização'] - df_pivot['Recarga']).dt.days
-    return df_pivot.reset_index()
+def paginated_dataframe(df, key, style=None, page_size=50):
+    """
+    Exibe df em páginas, com ordenação e fatiamento no servidor. `style` recebe
+    o Styler da página (ex.: lambda s: s.map(highlight_critical, subset=[...]))
+    e só é aplicado às linhas exibidas. `key` deve ser único por tabela na tela.
+    """
+    total = len(df)
+    if total <= PAGE_SIZES[0]:
+        st.dataframe(style(df.style) if style and total else df)
+        return
 
-def create_sankey_chart(df):
-    if len(df) < 2: return None
-    paths = df.groupby('chave')['etapa'].apply(list).reset_index()
-    links = paths['etapa'].apply(lambda x: list(zip(x, x[1:]))).explode().dropna()
-    if links.empty: return None
-    df_links = links.value_counts().reset_index(); df_links.columns = ['path', 'value']
-    df_links[['source', 'target']] = pd.DataFrame(df_links['path'].tolist(), index=df_links.index)
-    labels = pd.unique(df_links[['source', 'target']].values.ravel('K'))
-    label_map = {label: i for i, label in enumerate(labels)}
-    fig = go.Figure(go.Sankey(
-        node=dict(pad=25, thickness=20, label=labels, color="#f4a100"),
-        link=dict(source=df_links['source'].map(label_map), target=df_links['target'].map(label_map), value=df_links['value'])
-    ))
-    fig.update_layout(title_text="Fluxo de Itens Entre Etapas", font_size=12, margin=dict(l=0, r=0, t=40, b=5))
-    return fig
+    # Mudar a ordenação ou o tamanho da página volta para a primeira página.
+    voltar_ao_inicio = lambda: st.session_state.update({f"{key}_pagina": 1})
+    c1, c2, c3, c4 = st.columns([3, 2, 2, 2])
+    coluna = c1.selectbox("Ordenar por:", [SEM_ORDENACAO] + list(df.columns), key=f"{key}_ordem", on_change=voltar_ao_inicio)
+    sentido = c2.radio("Sentido:", ["↑ crescente", "↓ decrescente"], horizontal=True, key=f"{key}_sentido",
+                       disabled=coluna == SEM_ORDENACAO, on_change=voltar_ao_inicio)
+    tamanho = c3.selectbox("Linhas por página:", PAGE_SIZES, index=PAGE_SIZES.index(page_size), key=f"{key}_tamanho", on_change=voltar_ao_inicio)
+    n_paginas = -(-total // tamanho)
+    # A página guardada pode não existir mais depois de trocar filtros ou o tamanho da página.
+    if st.session_state.get(f"{key}_pagina", 1) > n_paginas:
+        st.session_state[f"{key}_pagina"] = 1
+    pagina = c4.number_input(f"Página (de {n_paginas}):", min_value=1, max_value=n_paginas, step=1, key=f"{key}_pagina")
 
-def clean_key_text(text):
-    """Função exportada para ser usada também no app.py"""
-    if pd.isna(text): return ""
-    s = str(text).replace('.0', '')
-    return re.sub(r'[^A-Z0-9]', '', s.upper())
\ No newline at end of file
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, total)
+    if coluna == SEM_ORDENACAO:
+        janela = df.iloc[inicio:fim]
+    else:
+        janela = df.iloc[_sort_positions(df[coluna], sentido.startswith("↑"))[inicio:fim]]
+    st.dataframe(style(janela.style) if style else janela)
+    st.caption(f"Exibindo {inicio + 1:,}–{fim:,} de {total:,} registros.".replace(",", "."))
@@ -0,0 +1,46 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Quantidade de resultados de filtros guardados (visões filtradas, métricas e figuras).
+VIEW_CACHE_MAX = int(os.environ.get("BI_VIEW_CACHE_MAX", "64"))
+
+class FilterStateCache:
+    """
+    LRU de resultados por estado dos filtros, compartilhado entre as sessões que
+    olham o mesmo conjunto de dados. A chave começa pela assinatura dos filtros
+    (dados, campos da chave, painel, cliente, NF); os valores são tratados como
+    somente leitura por quem os recebe.
+    """
+
+    def __init__(self, max_entries=VIEW_CACHE_MAX):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, *args):
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+        # Calcula fora do lock: duas sessões no mesmo filtro, no pior caso, calculam em dobro.
+        value = compute(*args)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "max_entries": self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
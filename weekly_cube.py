@@ -0,0 +1,45 @@
+from analytics import top_clientes
+
+CUBE_DIMS = ["tipo_item", "cliente", "etapa"]
+
+class WeeklyCube:
+    """
+    Agregados da visão geral montados uma vez por conjunto de dados:
+    semana × tipo_item × cliente × etapa com itens únicos (chaves) e registros,
+    mais os totais sem a semana. Como cada chave tem um só tipo e um só cliente,
+    os itens únicos podem ser somados entre painéis e clientes sem contar
+    ninguém duas vezes; entre semanas e etapas, não.
+    """
+
+    def __init__(self, df):
+        base = df[["chave"] + CUBE_DIMS].assign(semana=df["data_inicio"].dt.to_period("W"))
+        self.semanal = base.groupby(["semana"] + CUBE_DIMS, observed=True).agg(itens=("chave", "nunique"), registros=("chave", "size")).reset_index()
+        self.etapas = base.groupby(CUBE_DIMS, observed=True).agg(itens=("chave", "nunique"), registros=("chave", "size")).reset_index()
+        self.clientes = base.groupby(["tipo_item", "cliente"], observed=True)["chave"].nunique().rename("itens").reset_index()
+
+    @staticmethod
+    def _slice(tabela, painel="Todos", cliente="Todos"):
+        if painel != "Todos":
+            tabela = tabela[tabela["tipo_item"] == painel]
+        if cliente != "Todos":
+            tabela = tabela[tabela["cliente"] == cliente]
+        return tabela
+
+    def kpis(self, painel="Todos", cliente="Todos"):
+        """Itens únicos, orçados, finalizados e vazão semanal média (itens finalizados por semana)."""
+        etapas = self._slice(self.etapas, painel, cliente).groupby("etapa", observed=True)["itens"].sum()
+        semanal = self._slice(self.semanal, painel, cliente)
+        fin_semana = semanal[semanal["etapa"] == "Finalização"].groupby("semana")["itens"].sum()
+        return {
+            "itens": int(self._slice(self.clientes, painel, cliente)["itens"].sum()),
+            "orcados": int(etapas.get("Orçamento", 0)),
+            "finalizados": int(etapas.get("Finalização", 0)),
+            "throughput_semanal": fin_semana.mean() if not fin_semana.empty else 0,
+        }
+
+    def top_clientes(self, painel="Todos", n=10):
+        """Clientes com mais itens únicos, com o mesmo desempate de analytics.top_clientes."""
+        return top_clientes(self._slice(self.clientes, painel).groupby("cliente", observed=True)["itens"].sum(), n)
+
+    def registros_por_etapa(self, painel="Todos", cliente="Todos"):
+        return self._slice(self.etapas, painel, cliente).groupby("etapa", observed=True)["registros"].sum()